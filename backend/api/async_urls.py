@@ -0,0 +1,23 @@
+from django.urls import include, path
+
+from . import async_views
+
+urlpatterns = [
+    path(
+        'api/recipes/',
+        async_views.recipe_list,
+        name='async-recipes-list',
+    ),
+    path(
+        'api/recipes/<int:pk>/',
+        async_views.recipe_detail,
+        name='async-recipes-detail',
+    ),
+    path(
+        'api/ingredients/',
+        async_views.ingredient_list,
+        name='async-ingredients-list',
+    ),
+    path('api/tags/', async_views.tag_list, name='async-tags-list'),
+    path('', include('foodgram.urls')),
+]
@@ -0,0 +1,148 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import Http404, HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from foodgram.db_router import replica_reads
+from .caching import get_cached_recipe, overlay_user_flags
+from .renderers import FastJSONRenderer
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+ASYNC_URLCONF = 'api.async_urls'
+
+
+def run_sync(func):
+    """Run ``func`` in a worker thread, off the event loop.
+
+    Django 3.2 has no async ORM, so every query goes through here. Worker
+    threads are not tied to a request, so their connections are closed
+    or kept according to CONN_MAX_AGE after every call.
+    """
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def render(data, status=200):
+    return HttpResponse(
+        FastJSONRenderer().render(data),
+        status=status,
+        content_type='application/json',
+    )
+
+
+def async_api_view(view):
+    """Authenticate like DRF, read from a replica and render API errors."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            with replica_reads():
+                request = await authenticate(request)
+                return await view(request, *args, **kwargs)
+        except (exceptions.APIException, Http404) as exc:
+            error = exception_handler(exc, {})
+            response = render(error.data, error.status_code)
+            if error.status_code == 401:
+                response['WWW-Authenticate'] = 'Token'
+            return response
+    return wrapper
+
+
+@run_sync
+def authenticate(request):
+    request = Request(request, authenticators=[
+        authenticator()
+        for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    request.user
+    return request
+
+
+@run_sync
+def run_action(viewset, action, request, **kwargs):
+    """Run a viewset action the way DRF's dispatch does.
+
+    The queryset, filters, paginator, serializers and response cache are
+    the viewset's own, so the async endpoints answer exactly like the sync
+    ones. ``request`` has already been authenticated by async_api_view.
+    """
+    view = viewset(
+        action=action,
+        action_map={'get': action, 'head': action},
+        args=(),
+        kwargs=kwargs,
+        request=request,
+    )
+    view.headers = view.default_response_headers
+    try:
+        view.initial(request, **kwargs)
+        response = getattr(view, action)(request, **kwargs)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+    response = view.finalize_response(request, response, **kwargs)
+    if isinstance(response, Response):
+        response.render()
+    return response
+
+
+@async_api_view
+async def recipe_list(request):
+    return await run_action(RecipeViewSet, 'list', request)
+
+
+@async_api_view
+async def recipe_detail(request, pk):
+    media_type = FastJSONRenderer.media_type
+    (content_type, content, offsets), flags = await asyncio.gather(
+        run_sync(get_cached_recipe)(
+            pk,
+            media_type,
+            lambda: RecipeViewSet.render_recipe(
+                request, pk, FastJSONRenderer(), media_type
+            ),
+        ),
+        run_sync(RecipeViewSet.get_user_flags)(request.user, pk),
+    )
+    return HttpResponse(
+        overlay_user_flags(content, offsets, flags),
+        content_type=content_type,
+    )
+
+
+@async_api_view
+async def ingredient_list(request):
+    return await run_action(IngredientViewSet, 'list', request)
+
+
+@async_api_view
+async def tag_list(request):
+    return await run_action(TagViewSet, 'list', request)
+
+
+class AsyncReadsMiddleware(MiddlewareMixin):
+    """Route safe-method ASGI requests to the async read views.
+
+    Everything the async URLconf does not cover falls through to the
+    regular URLconf it includes.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.method in ('GET', 'HEAD'):
+            request.urlconf = ASYNC_URLCONF
+        return await self.get_response(request)
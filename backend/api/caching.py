@@ -0,0 +1,166 @@
+import hashlib
+import re
+import time
+from operator import itemgetter
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+from foodgram.db_router import primary_reads
+
+GENERATION_KEY = 'generation:{namespace}'
+RESPONSE_KEY = 'response:{namespace}:{generation}:{media_type}:{path}'
+RECIPE_KEY = 'recipe:{pk}:{generations}:{media_type}'
+# Quotes inside JSON strings are escaped, so only the keys match.
+USER_FLAGS = re.compile(
+    rb'"(is_favorited|is_in_shopping_cart|is_subscribed)":\s*(false)'
+)
+
+
+def get_generation(namespace):
+    key = GENERATION_KEY.format(namespace=namespace)
+    generation = cache.get(key)
+    if generation is None:
+        # A fresh counter must not reuse the numbers of an evicted one.
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def get_generations(*namespaces):
+    keys = [
+        GENERATION_KEY.format(namespace=namespace)
+        for namespace in namespaces
+    ]
+    found = cache.get_many(keys)
+    return [
+        found.get(key) or get_generation(namespace)
+        for key, namespace in zip(keys, namespaces)
+    ]
+
+
+def bump_generation(namespace):
+    key = GENERATION_KEY.format(namespace=namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_generation_on_commit(namespace):
+    transaction.on_commit(lambda: bump_generation(namespace))
+
+
+class AnonymousRequest:
+    """Serializer context rendering what any visitor sees."""
+
+    user = AnonymousUser()
+
+    def __init__(self, request):
+        self.build_absolute_uri = request.build_absolute_uri
+
+
+def render_with_offsets(render):
+    content_type, content = render()
+    offsets = {
+        match[1].decode(): match.start(2)
+        for match in USER_FLAGS.finditer(content)
+    }
+    return content_type, content, offsets
+
+
+def get_cached_recipe(pk, media_type, render):
+    """Return the cached user-independent rendering of a recipe.
+
+    ``render`` returns ``(content_type, content)`` for an anonymous user.
+    Entries are keyed by the generations of the recipe, tags and
+    ingredients, and hold the offsets of the per-user flags. Without a
+    shared cache backend (RECIPE_DETAIL_CACHE) every call renders anew.
+    """
+    if not settings.RECIPE_DETAIL_CACHE:
+        return render_with_offsets(render)
+    generations = get_generations(f'recipe:{pk}', 'tags', 'ingredients')
+    key = RECIPE_KEY.format(
+        pk=pk,
+        generations=':'.join(map(str, generations)),
+        media_type=media_type.replace(' ', ''),
+    )
+    cached = cache.get(key)
+    if cached is None:
+        cached = render_with_offsets(render)
+        cache.set(key, cached)
+    return cached
+
+
+def overlay_user_flags(content, offsets, flags):
+    """Patch the requesting user's flags into cached rendered content."""
+    parts = []
+    position = 0
+    for name, offset in sorted(offsets.items(), key=itemgetter(1)):
+        parts += (
+            content[position:offset], b'true' if flags[name] else b'false'
+        )
+        position = offset + len(b'false')
+    parts.append(content[position:])
+    return b''.join(parts)
+
+
+class CachedResponseMixin:
+    """Serve list and retrieve from pre-rendered JSON with strong ETags.
+
+    Cached entries are keyed by a generation counter of ``cache_namespace``
+    which signal handlers bump whenever the underlying models change.
+    """
+
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+        key = RESPONSE_KEY.format(
+            namespace=self.cache_namespace,
+            generation=get_generation(self.cache_namespace),
+            media_type=request.accepted_media_type,
+            path=request.get_full_path(),
+        )
+        cached = cache.get(key)
+        if cached is None:
+            # Stored under the generation bumped by the last commit, so
+            # read from primary: a lagging replica may not have it yet.
+            with primary_reads():
+                response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response = self.finalize_response(
+                request, response, *args, **kwargs
+            )
+            content = response.render().content
+            cached = (
+                f'"{hashlib.sha1(content).hexdigest()}"',
+                response['Content-Type'],
+                content,
+            )
+            cache.set(key, cached)
+        etag, content_type, content = cached
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
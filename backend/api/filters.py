@@ -1,6 +1,9 @@
+from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Ingredient, Recipe
+from recipes.tag_index import tag_index
 
 
 class IngredientFilter(FilterSet):
@@ -14,20 +17,57 @@ class IngredientFilter(FilterSet):
         fields = ('name',)
 
 
+class StableOrderingFilter(filters.OrderingFilter):
+    """Break ties by id so paginated orderings stay deterministic."""
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        return super().filter(qs, [*value, '-id'])
+
+
+class TagSlugField(forms.MultipleChoiceField):
+
+    def valid_value(self, value):
+        return tag_index.get(value) is not None
+
+
+class TagFilter(filters.Filter):
+    """Recipes with any of the tags, as one EXISTS on the through table.
+
+    Unlike a join on ``tags__slug`` it yields every recipe once, so the
+    page and its COUNT need no DISTINCT, and the slugs are resolved from
+    the in-memory tag index instead of a query per request.
+    """
+
+    field_class = TagSlugField
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        tag_ids = {tag_index.get(slug) for slug in value} - {None}
+        return qs.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+        )))
+
+
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
-    )
+    tags = TagFilter()
     is_favorited = filters.NumberFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.NumberFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
+    ordering = StableOrderingFilter(
+        fields=('pub_date', 'favorites_count', 'in_carts_count'),
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',)
+        fields = (
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart', 'search',
+            'ordering',
+        )
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
@@ -38,3 +78,6 @@ class RecipeFilter(FilterSet):
         if value and self.request.user.is_authenticated:
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value)
@@ -0,0 +1,413 @@
+import random
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.test import APIClient
+
+from recipes import similarities
+from recipes.cookable_index import cookable_index
+from recipes.counters import recalculate_counters
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from recipes.tag_index import tag_index
+from users.models import Subscribe, User
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAA'
+    'CVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAA'
+    'ggCByxOyYQAAAABJRU5ErkJggg=='
+)
+SMALL_PAGE = 6
+LARGE_PAGE = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database and report SQL query count and '
+        'latency for every API endpoint, failing on query budget overruns '
+        'and on query counts that grow with the page size.'
+    )
+    success_message = 'All endpoints within budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=6)
+        parser.add_argument('--tags', type=int, default=5)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--relations-per-user', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        try:
+            # Image variants are generated inline so no worker thread
+            # outlives the test database.
+            with override_settings(
+                MEDIA_ROOT=tempfile.mkdtemp(),
+                IMAGE_PROCESSING_WORKERS=0,
+                REPLICA_DATABASES=[],
+            ):
+                self.seed(options)
+                failures = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        if failures:
+            raise CommandError('\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS(self.success_message))
+
+    def run(self, options):
+        return self.run_benchmarks(options['repeat'])
+
+    def seed(self, options):
+        rnd = random.Random(options['seed'])
+        started = time.perf_counter()
+        # Primary keys are only returned by bulk_create on PostgreSQL,
+        # so every seeded table is read back before it is referenced.
+        Tag.objects.bulk_create(
+            Tag(name=f'Tag {i}', slug=f'tag-{i}', color='#FF0000')
+            for i in range(options['tags'])
+        )
+        tags = list(Tag.objects.order_by('id'))
+        # A warmed-up worker holds the tags in memory; bulk_create sends
+        # no signal to refresh an index built before the seeding.
+        tag_index.build()
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ingredient {i}', measurement_unit='g')
+            for i in range(options['ingredients'])
+        )
+        ingredients = list(Ingredient.objects.order_by('id'))
+        User.objects.bulk_create(
+            User(
+                username=f'user{i}',
+                email=f'user{i}@example.com',
+                password='!',
+            )
+            for i in range(options['users'])
+        )
+        users = list(User.objects.order_by('id'))
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=users[0] if i == 0 else rnd.choice(users),
+                name=f'Recipe {i}',
+                image='static/recipe/benchmark.png',
+                text='Benchmark recipe',
+                cooking_time=rnd.randint(1, 120),
+            )
+            for i in range(options['recipes'])
+        )
+        recipes = list(Recipe.objects.order_by('id'))
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe in recipes
+            for tag in rnd.sample(tags, options['tags_per_recipe'])
+        )
+        IngredientRecipe.objects.bulk_create(
+            (
+                IngredientRecipe(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=rnd.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient in rnd.sample(
+                    ingredients, options['ingredients_per_recipe']
+                )
+            ),
+            batch_size=1000,
+        )
+        per_user = options['relations_per_user']
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                (
+                    model(user=user, recipe=recipe)
+                    for user in users
+                    for recipe in rnd.sample(recipes, per_user)
+                ),
+                batch_size=1000,
+            )
+        Subscribe.objects.bulk_create(
+            (
+                Subscribe(user=user, author=author)
+                for user in users
+                for author in rnd.sample(users, per_user)
+                if author != user
+            ),
+            batch_size=1000,
+        )
+        # The benchmark user follows enough authors to fill a large page.
+        self.user = users[0]
+        Subscribe.objects.bulk_create(
+            (
+                Subscribe(user=self.user, author=author)
+                for author in users[1:LARGE_PAGE + 1]
+            ),
+            ignore_conflicts=True,
+        )
+        recalculate_counters()
+        cookable_index.build()
+        if similarities.np is not None:
+            similarities.build_similarities()
+        self.recipe = Recipe.objects.exclude(author=self.user).exclude(
+            favorite__user=self.user
+        ).exclude(shopping_cart__user=self.user).first()
+        self.own_recipe = Recipe.objects.filter(author=self.user).first()
+        self.batch_recipes = list(Recipe.objects.exclude(
+            author=self.user
+        ).exclude(favorite__user=self.user).exclude(
+            shopping_cart__user=self.user
+        ).exclude(pk=self.recipe.pk).values_list('id', flat=True)[
+            :LARGE_PAGE
+        ])
+        self.author = User.objects.exclude(
+            following__user=self.user
+        ).exclude(pk=self.user.pk).first()
+        self.ingredients = ingredients
+        self.tags = tags
+        self.stdout.write(
+            f'Seeded {len(users)} users, {len(recipes)} recipes in '
+            f'{time.perf_counter() - started:.1f}s'
+        )
+
+    def get_cases(self):
+        """Return (name, method, url, data, query budget) per endpoint."""
+        recipe_data = {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in self.ingredients[:5]
+            ],
+            'tags': [tag.id for tag in self.tags[:2]],
+            'image': IMAGE,
+            'name': 'Benchmark recipe',
+            'text': 'Benchmark recipe',
+            'cooking_time': 10,
+        }
+        recipe = f'/api/recipes/{self.recipe.id}/'
+        pantry = '&'.join(
+            f'ingredients={ingredient.id}'
+            for ingredient in self.ingredients[:20]
+        )
+        batch = {'recipes': self.batch_recipes}
+        batch_favorite = '/api/recipes/favorite/'
+        batch_cart = '/api/recipes/shopping_cart/'
+        return [
+            ('users list', 'get', '/api/users/?limit={limit}', None, 4),
+            ('users me', 'get', '/api/users/me/', None, 2),
+            ('users detail', 'get', f'/api/users/{self.author.id}/', None, 2),
+            (
+                'subscriptions',
+                'get',
+                '/api/users/subscriptions/?limit={limit}&recipes_limit=3',
+                None,
+                5,
+            ),
+            (
+                'subscriptions cursor',
+                'get',
+                '/api/users/subscriptions/?limit={limit}&recipes_limit=3'
+                '&cursor=',
+                None,
+                4,
+            ),
+            (
+                'subscribe',
+                'post',
+                f'/api/users/{self.author.id}/subscribe/',
+                None,
+                8,
+            ),
+            (
+                'unsubscribe',
+                'delete',
+                f'/api/users/{self.author.id}/subscribe/',
+                None,
+                5,
+            ),
+            ('tags list', 'get', '/api/tags/', None, 2),
+            ('tags detail', 'get', f'/api/tags/{self.tags[0].id}/', None, 2),
+            ('ingredients list', 'get', '/api/ingredients/', None, 2),
+            (
+                'ingredients search',
+                'get',
+                '/api/ingredients/?name=ingredient 1',
+                None,
+                2,
+            ),
+            (
+                'ingredients detail',
+                'get',
+                f'/api/ingredients/{self.ingredients[0].id}/',
+                None,
+                2,
+            ),
+            ('recipes list', 'get', '/api/recipes/?limit={limit}', None, 6),
+            (
+                'recipes list cursor',
+                'get',
+                '/api/recipes/?limit={limit}&cursor=',
+                None,
+                5,
+            ),
+            (
+                'recipes list by tag',
+                'get',
+                f'/api/recipes/?limit={{limit}}&tags={self.tags[0].slug}',
+                None,
+                6,
+            ),
+            (
+                'recipes favorited',
+                'get',
+                '/api/recipes/?limit={limit}&is_favorited=1',
+                None,
+                6,
+            ),
+            (
+                'recipes search',
+                'get',
+                '/api/recipes/?limit={limit}&search=recipe 1',
+                None,
+                6,
+            ),
+            ('recipes detail', 'get', recipe, None, 5),
+            (
+                'recipes recommended',
+                'get',
+                '/api/recipes/recommended/?limit={limit}',
+                None,
+                6,
+            ),
+            (
+                'recipes cookable',
+                'get',
+                f'/api/recipes/cookable/?limit={{limit}}&{pantry}',
+                None,
+                5,
+            ),
+            ('recipes create', 'post', '/api/recipes/', recipe_data, 24),
+            # Saves also refresh the recipe in the cookable index, and
+            # adjust the cart totals when the recipe is in a cart.
+            (
+                'recipes update',
+                'patch',
+                f'/api/recipes/{self.own_recipe.id}/',
+                recipe_data,
+                32,
+            ),
+            ('favorite', 'post', f'{recipe}favorite/', None, 8),
+            ('unfavorite', 'delete', f'{recipe}favorite/', None, 8),
+            # Cart writes also maintain the cart ingredient totals.
+            (
+                'shopping cart add',
+                'post',
+                f'{recipe}shopping_cart/',
+                None,
+                16,
+            ),
+            (
+                'shopping cart remove',
+                'delete',
+                f'{recipe}shopping_cart/',
+                None,
+                16,
+            ),
+            # Batch writes cost the same number of queries for any size.
+            ('favorite batch', 'post', batch_favorite, batch, 6),
+            ('unfavorite batch', 'delete', batch_favorite, batch, 6),
+            ('shopping cart batch add', 'post', batch_cart, batch, 14),
+            ('shopping cart batch remove', 'delete', batch_cart, batch, 14),
+            (
+                'download shopping cart',
+                'get',
+                '/api/recipes/download_shopping_cart/',
+                None,
+                3,
+            ),
+            (
+                'download shopping cart csv',
+                'get',
+                '/api/recipes/download_shopping_cart/?format=csv',
+                None,
+                3,
+            ),
+            (
+                'download shopping cart pdf',
+                'get',
+                '/api/recipes/download_shopping_cart/?format=pdf',
+                None,
+                3,
+            ),
+        ]
+
+    def measure(self, client, method, url, data, repeat):
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data, format='json')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append(time.perf_counter() - started)
+            queries = max(queries, len(context.captured_queries))
+            if method != 'get':
+                # Mutations are only repeatable as a pair, measure once.
+                break
+        return response, queries, statistics.median(timings) * 1000
+
+    def run_benchmarks(self, repeat):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        failures = []
+        self.stdout.write(f'{"endpoint":<28}{"status":>7}{"queries":>9}'
+                          f'{"ms":>10}')
+        for name, method, url, data, budget in self.get_cases():
+            if '{limit}' in url:
+                sizes = (SMALL_PAGE, LARGE_PAGE)
+            else:
+                sizes = (None,)
+            counts = []
+            for size in sizes:
+                response, queries, elapsed = self.measure(
+                    client, method, url.format(limit=size), data, repeat
+                )
+                counts.append(queries)
+                label = name if size is None else f'{name} [{size}]'
+                self.stdout.write(
+                    f'{label:<28}{response.status_code:>7}{queries:>9}'
+                    f'{elapsed:>10.1f}'
+                )
+                if response.status_code >= 400:
+                    failures.append(
+                        f'{label}: unexpected status {response.status_code}'
+                    )
+                if queries > budget:
+                    failures.append(
+                        f'{label}: {queries} queries, budget is {budget}'
+                    )
+            if len(set(counts)) > 1:
+                failures.append(
+                    f'{name}: query count grows with page size {counts}'
+                )
+        return failures
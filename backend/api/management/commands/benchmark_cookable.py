@@ -0,0 +1,67 @@
+import time
+
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from recipes.cookable_index import MAX_MATCHES, cookable_index
+from recipes.models import Recipe
+from .benchmark_api import Command as BenchmarkCommand
+
+
+def match_sql(ingredient_ids, limit=MAX_MATCHES):
+    """The GROUP BY query the cookable index replaces."""
+    return list(Recipe.objects.annotate(
+        matched=Count(
+            'ingredient_list',
+            filter=Q(ingredient_list__ingredient__in=ingredient_ids),
+        ),
+        total=Count('ingredient_list'),
+    ).filter(matched__gt=0).order_by(
+        (Cast('matched', FloatField()) / F('total')).desc(),
+        (F('matched') - F('total')).desc(),
+        '-id',
+    ).values_list('id', 'matched', 'total')[:limit])
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Seed a throwaway test database and compare the cookable index '
+        'with a GROUP BY query for growing sets of ingredients.'
+    )
+    success_message = 'Cookable index matches the GROUP BY query'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(recipes=100000, relations_per_user=1)
+
+    def run(self, options):
+        started = time.perf_counter()
+        cookable_index.build()
+        self.stdout.write(
+            f'Index built in {(time.perf_counter() - started) * 1000:.0f}ms'
+        )
+        ingredient_ids = [ingredient.id for ingredient in self.ingredients]
+        failures = []
+        self.stdout.write(
+            f'{"ingredients":>12}{"matches":>9}{"sql ms":>9}{"index ms":>10}'
+        )
+        for size in (5, 20, 50, 100):
+            step = max(len(ingredient_ids) // size, 1)
+            pantry = ingredient_ids[::step][:size]
+            timings, results = {}, {}
+            for name, match in (
+                ('sql', match_sql), ('index', cookable_index.match)
+            ):
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    results[name] = match(pantry)
+                timings[name] = (
+                    (time.perf_counter() - started) * 1000 / options['repeat']
+                )
+            self.stdout.write(
+                f'{size:>12}{len(results["index"]):>9}'
+                f'{timings["sql"]:>9.1f}{timings["index"]:>10.1f}'
+            )
+            if results['sql'] != results['index']:
+                failures.append(f'{size} ingredients: results differ')
+        return failures
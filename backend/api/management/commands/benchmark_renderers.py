@@ -0,0 +1,80 @@
+import time
+
+from django.core.management.base import CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer, orjson
+from api.serializer import IngredientSerializer, RecipesSerializer
+from recipes.models import Ingredient, Recipe
+from .benchmark_api import Command as BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Seed a throwaway test database and compare render times of '
+        'JSONRenderer and FastJSONRenderer on real API payloads.'
+    )
+    success_message = 'Renderers produce identical output'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def get_payloads(self):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = self.user
+        context = {'request': request}
+        recipes = Recipe.objects.with_related().with_user_flags(
+            self.user
+        ).order_by('-pub_date', '-id')
+        return [
+            (
+                'ingredients list',
+                IngredientSerializer(
+                    Ingredient.objects.all(), many=True
+                ).data,
+            ),
+            (
+                'recipes page of 6',
+                RecipesSerializer(
+                    recipes[:6], many=True, context=context
+                ).data,
+            ),
+            (
+                'recipes page of 100',
+                RecipesSerializer(
+                    recipes[:100], many=True, context=context
+                ).data,
+            ),
+        ]
+
+    @staticmethod
+    def time_render(renderer, data, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            content = renderer.render(data)
+        return (time.perf_counter() - started) / iterations * 1000, content
+
+    def run(self, options):
+        if orjson is None:
+            raise CommandError('orjson is not installed')
+        failures = []
+        self.stdout.write(
+            f'{"payload":<22}{"bytes":>10}{"json ms":>10}'
+            f'{"fast ms":>10}{"speedup":>10}'
+        )
+        for name, data in self.get_payloads():
+            baseline, expected = self.time_render(
+                JSONRenderer(), data, options['iterations']
+            )
+            fast, content = self.time_render(
+                FastJSONRenderer(), data, options['iterations']
+            )
+            self.stdout.write(
+                f'{name:<22}{len(content):>10}{baseline:>10.2f}'
+                f'{fast:>10.2f}{baseline / fast:>9.1f}x'
+            )
+            if content != expected:
+                failures.append(f'{name}: rendered output differs')
+        return failures
@@ -0,0 +1,102 @@
+import statistics
+import time
+
+from django.db import connection
+from django.http import QueryDict
+from rest_framework.test import APIClient
+
+from api.filters import RecipeFilter
+from api.pagination import CustomPagination
+from recipes.models import Recipe
+from .benchmark_api import Command as BenchmarkCommand
+
+PAGE = CustomPagination.page_size
+ORDERING = ('-pub_date', '-id')
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Seed a throwaway test database and compare the tag filter with '
+        'the former join on tags__slug for a growing number of tags.'
+    )
+    success_message = 'Tag filter pages match the join and are not slower'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(
+            recipes=100000,
+            tags=16,
+            tags_per_recipe=3,
+            ingredients_per_recipe=1,
+            relations_per_user=1,
+        )
+
+    def time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - started)
+        return result, statistics.median(timings) * 1000
+
+    def run(self, options):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        slugs = [tag.slug for tag in self.tags]
+        repeat = options['repeat']
+        failures = []
+        self.stdout.write(
+            f'{"tags":>5}{"matches":>9}{"page: join":>12}{"exists":>8}'
+            f'{"count: join":>13}{"exists":>8}{"api":>7}{"cursor":>8}'
+        )
+        sizes = sorted({1, 2, 4, len(slugs) // 2, len(slugs)} - {0})
+        for size in sizes:
+            data = QueryDict(mutable=True)
+            data.setlist('tags', slugs[:size])
+            joined = Recipe.objects.filter(
+                tags__slug__in=slugs[:size]
+            ).distinct().order_by(*ORDERING)
+            exists = RecipeFilter(
+                data=data, queryset=Recipe.objects.order_by(*ORDERING)
+            ).qs
+            joined_page, joined_page_ms = self.time(
+                lambda: list(joined.values_list('id', flat=True)[:PAGE]),
+                repeat,
+            )
+            exists_page, exists_page_ms = self.time(
+                lambda: list(exists.values_list('id', flat=True)[:PAGE]),
+                repeat,
+            )
+            joined_count, joined_count_ms = self.time(joined.count, repeat)
+            exists_count, exists_count_ms = self.time(exists.count, repeat)
+            response, api_ms = self.time(
+                lambda: client.get('/api/recipes/', data), repeat
+            )
+            cursor_data = data.copy()
+            cursor_data['cursor'] = ''
+            cursor_response, cursor_ms = self.time(
+                lambda: client.get('/api/recipes/', cursor_data), repeat
+            )
+            self.stdout.write(
+                f'{size:>5}{exists_count:>9}{joined_page_ms:>12.1f}'
+                f'{exists_page_ms:>8.1f}{joined_count_ms:>13.1f}'
+                f'{exists_count_ms:>8.1f}{api_ms:>7.1f}{cursor_ms:>8.1f}'
+            )
+            if (exists_page, exists_count) != (joined_page, joined_count):
+                failures.append(f'{size} tags: results differ from the join')
+            for checked in (response, cursor_response):
+                if checked.status_code != 200:
+                    failures.append(
+                        f'{size} tags: unexpected status '
+                        f'{checked.status_code}'
+                    )
+            # Allow for timer noise on the fastest cases.
+            if exists_page_ms > joined_page_ms * 1.2 + 1:
+                failures.append(
+                    f'{size} tags: the EXISTS page took '
+                    f'{exists_page_ms:.1f}ms, the join '
+                    f'{joined_page_ms:.1f}ms'
+                )
+        return failures
@@ -0,0 +1,139 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from itertools import cycle
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from rest_framework.authtoken.models import Token
+
+from foodgram.postgresql.base import close_pools
+from .benchmark_api import Command as BenchmarkCommand
+
+POOLED_ENGINE = 'foodgram.postgresql'
+
+
+def make_environ(url, token):
+    path, _, query = url.partition('?')
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': 'testserver',
+        'HTTP_AUTHORIZATION': f'Token {token}',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+    }
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Seed a throwaway test database and measure requests/sec through '
+        'the WSGI handler with a new connection per request, persistent '
+        'connections and pooled connections.'
+    )
+    success_message = 'Throughput benchmark finished'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=5,
+            help='Seconds to run every connection mode',
+        )
+
+    def get_modes(self, options):
+        modes = [
+            ('new connection per request', {'CONN_MAX_AGE': 0}),
+            ('persistent connections', {'CONN_MAX_AGE': 600}),
+        ]
+        if connection.settings_dict['ENGINE'] == POOLED_ENGINE:
+            modes.append((
+                'pooled connections',
+                {'CONN_MAX_AGE': 0, 'POOL_SIZE': options['threads']},
+            ))
+        return modes
+
+    def get_urls(self):
+        return [
+            '/api/recipes/?limit=6',
+            f'/api/recipes/{self.recipe.id}/',
+            '/api/ingredients/?name=ingredient 1',
+            f'/api/users/{self.author.id}/',
+        ]
+
+    def run_mode(self, environs, options):
+        application = WSGIHandler()
+        deadline = time.perf_counter() + options['duration']
+        opened = set()
+        lock = threading.Lock()
+
+        def count_connection(sender, connection, **kwargs):
+            # Pooled connections are reported again on every checkout.
+            with lock:
+                opened.add(connection.connection)
+
+        def start_response(status, headers, exc_info=None):
+            if not status.startswith('200'):
+                raise RuntimeError(f'Unexpected response {status}')
+
+        def worker(offset):
+            served = 0
+            requests = cycle(environs[offset:] + environs[:offset])
+            try:
+                while time.perf_counter() < deadline:
+                    environ = dict(next(requests), **{
+                        'wsgi.input': BytesIO()
+                    })
+                    response = application(environ, start_response)
+                    b''.join(response)
+                    response.close()
+                    served += 1
+            finally:
+                connections.close_all()
+            return served
+
+        connection_created.connect(count_connection)
+        try:
+            with ThreadPoolExecutor(options['threads']) as executor:
+                served = sum(executor.map(
+                    worker,
+                    (
+                        number % len(environs)
+                        for number in range(options['threads'])
+                    ),
+                ))
+        finally:
+            connection_created.disconnect(count_connection)
+            close_pools()
+        return served / options['duration'], len(opened)
+
+    def run(self, options):
+        token = Token.objects.get_or_create(user=self.user)[0].key
+        environs = [make_environ(url, token) for url in self.get_urls()]
+        settings_dict = connections.databases['default']
+        original = dict(settings_dict)
+        connections.close_all()
+        self.stdout.write(
+            f'{"mode":<30}{"req/s":>10}{"server connections":>20}'
+        )
+        try:
+            for name, overrides in self.get_modes(options):
+                settings_dict.update(overrides)
+                rate, opened = self.run_mode(environs, options)
+                self.stdout.write(f'{name:<30}{rate:>10.0f}{opened:>20}')
+                settings_dict.clear()
+                settings_dict.update(original)
+        finally:
+            settings_dict.clear()
+            settings_dict.update(original)
+        return []
@@ -0,0 +1,122 @@
+import time
+
+from django.core.management.base import CommandError
+from django.db import connection
+
+from api.filters import RecipeFilter
+from api.pagination import CustomPagination
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from users.models import User
+from .benchmark_api import Command as BenchmarkCommand
+
+INDEX_MARKERS = {
+    'postgresql': ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan'),
+    'sqlite': (
+        'USING INDEX',
+        'USING COVERING INDEX',
+        'USING INTEGER PRIMARY KEY',
+        'USING PRIMARY KEY',
+    ),
+}
+PAGE = CustomPagination.page_size
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Seed a throwaway test database and check with EXPLAIN that every '
+        'hot API filter is served by an index.'
+    )
+    success_message = 'Every hot filter is served by an index'
+
+    def get_queries(self):
+        """Return (name, queryset, vendors it applies to or None)."""
+        user = self.user
+        recipes = Recipe.objects.order_by('-pub_date', '-id')
+        return [
+            ('recipes page', recipes[:PAGE], None),
+            (
+                'recipes by tag',
+                RecipeFilter(
+                    data={'tags': [self.tags[0].slug]}, queryset=recipes
+                ).qs[:PAGE],
+                None,
+            ),
+            ('recipes by author', recipes.filter(author=user)[:PAGE], None),
+            (
+                'favorited recipes',
+                recipes.filter(favorite__user=user)[:PAGE],
+                None,
+            ),
+            (
+                'recipes in cart',
+                recipes.filter(shopping_cart__user=user)[:PAGE],
+                None,
+            ),
+            (
+                'popular recipes',
+                Recipe.objects.order_by('-favorites_count', '-id')[:PAGE],
+                None,
+            ),
+            (
+                'favorite lookup',
+                Favorite.objects.filter(user=user, recipe=self.recipe),
+                None,
+            ),
+            (
+                'cart lookup',
+                ShoppingCart.objects.filter(user=user, recipe=self.recipe),
+                None,
+            ),
+            (
+                'recipe favorited by',
+                Favorite.objects.filter(recipe=self.recipe),
+                None,
+            ),
+            (
+                'subscriptions',
+                User.objects.filter(following__user=user)[:PAGE],
+                None,
+            ),
+            (
+                'followers',
+                User.objects.filter(subscriber__author=user)[:PAGE],
+                None,
+            ),
+            # SQLite cannot index a case-insensitive LIKE; the endpoint
+            # is served from the in-memory ingredient index anyway.
+            (
+                'ingredient prefix',
+                Ingredient.objects.filter(
+                    name__istartswith=self.ingredients[-1].name
+                ),
+                ('postgresql',),
+            ),
+        ]
+
+    def run(self, options):
+        markers = INDEX_MARKERS.get(connection.vendor)
+        if markers is None:
+            raise CommandError(
+                f'No EXPLAIN checks for the {connection.vendor} backend'
+            )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        failures = []
+        for name, queryset, vendors in self.get_queries():
+            if vendors and connection.vendor not in vendors:
+                self.stdout.write(f'{name:<24}skipped')
+                continue
+            started = time.perf_counter()
+            list(queryset)
+            elapsed = (time.perf_counter() - started) * 1000
+            plan = queryset.explain()
+            uses_index = any(marker in plan for marker in markers)
+            self.stdout.write(
+                f'{name:<24}{"index" if uses_index else "NO INDEX":<10}'
+                f'{elapsed:>8.1f}ms'
+            )
+            if options['verbosity'] > 1:
+                self.stdout.write(plan)
+            if not uses_index:
+                failures.append(f'{name} does not use an index:\n{plan}')
+        return failures
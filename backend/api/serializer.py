@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
@@ -5,12 +6,16 @@ from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField
 
+from recipes.images import schedule_variants
 from recipes.models import (
     Favorite, Ingredient, IngredientRecipe,
-    Recipe, ShoppingCart, Tag
+    Recipe, ShoppingCart, ShoppingCartIngredient, Tag
 )
 from users.models import User
 
+MAX_BATCH_SIZE = 500
+MAX_PANTRY_SIZE = 100
+
 
 class UserSerializer(UserSerializer):
 
@@ -20,6 +25,9 @@ class UserSerializer(UserSerializer):
         user = self.context.get('request').user
         if user.is_anonymous or (user == obj):
             return False
+        is_subscribed = getattr(obj, 'is_subscribed', None)
+        if is_subscribed is not None:
+            return is_subscribed
         return user.subscriber.filter(author=obj).exists()
 
     class Meta:
@@ -43,12 +51,14 @@ class RecipeShortListSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'thumbnail',
+            'image_webp',
             'cooking_time',
         )
 
 
 class SubscribeSerializer(UserSerializer):
-    recipes_count = SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
     recipes = SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
@@ -75,20 +85,18 @@ class SubscribeSerializer(UserSerializer):
         return data
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[: int(limit)]
+        recipes = getattr(obj, 'recipes_window', None)
+        if recipes is None:
+            request = self.context.get('request')
+            limit = request.GET.get('recipes_limit')
+            recipes = obj.recipes.all()
+            if limit:
+                recipes = recipes[: int(limit)]
         serializer = RecipeShortListSerializer(
             recipes, many=True, read_only=True
         )
         return serializer.data
 
-    @staticmethod
-    def get_recipes_count(obj):
-        return obj.recipes.count()
-
 
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
@@ -132,19 +140,32 @@ class RecipesSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time'
+                  'name', 'image', 'thumbnail', 'image_webp', 'text',
+                  'cooking_time'
                   )
 
+    def to_representation(self, instance):
+        author_is_subscribed = getattr(instance, 'author_is_subscribed', None)
+        if author_is_subscribed is not None:
+            instance.author.is_subscribed = author_is_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        is_favorited = getattr(obj, 'is_favorited', None)
+        if is_favorited is not None:
+            return is_favorited
         return obj.favorite.filter(user=request.user).exists()
 
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        is_in_shopping_cart = getattr(obj, 'is_in_shopping_cart', None)
+        if is_in_shopping_cart is not None:
+            return is_in_shopping_cart
         return obj.shopping_cart.filter(user=request.user).exists()
 
 
@@ -180,7 +201,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ]
 
     def validate(self, data):
-        ingredients = data.get('ingredients')
+        ingredients = data.get('ingredients', ())
         ingredient_list = []
         for ingredient_data in ingredients:
             amount = ingredient_data['amount']
@@ -205,6 +226,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             for ingredient_data in ingredients
         ])
 
+    @transaction.atomic
     def create(self, validated_data):
         request = self.context.get('request', None)
         tags = validated_data.pop('tags')
@@ -219,15 +241,63 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         )
         recipe.tags.set(tags)
         self.create_ingredients(recipe, ingredients)
+        schedule_variants(recipe)
         return recipe
 
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        """Apply only the differences between stored and new ingredients."""
+        existing = {
+            ingredient.ingredient_id: ingredient
+            for ingredient in recipe.ingredient_list.all()
+        }
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = existing.keys() - amounts.keys()
+        changed = []
+        deltas = {
+            ingredient_id: -existing[ingredient_id].amount
+            for ingredient_id in removed
+        }
+        for ingredient_id, amount in amounts.items():
+            ingredient = existing.get(ingredient_id)
+            old_amount = ingredient.amount if ingredient else 0
+            deltas[ingredient_id] = amount - old_amount
+            if ingredient and ingredient.amount != amount:
+                ingredient.amount = amount
+                changed.append(ingredient)
+        if removed:
+            IngredientRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ('amount',))
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        )
+        if any(deltas.values()):
+            ShoppingCartIngredient.objects.apply_deltas(
+                recipe.shopping_cart.values_list('user_id', flat=True), deltas
+            )
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        IngredientRecipe.objects.filter(recipe=instance).delete()
-        instance.tags.set(validated_data.pop('tags'))
-        ingredients = validated_data.pop('ingredients')
-        self.create_ingredients(instance, ingredients)
-        return super().update(instance, validated_data)
+        tags = validated_data.pop('tags', None)
+        if tags is not None:
+            instance.tags.set(tags)
+        ingredients = validated_data.pop('ingredients', None)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
+        instance = super().update(instance, validated_data)
+        if 'image' in validated_data:
+            schedule_variants(instance)
+        return instance
 
     def to_representation(self, instance):
         return RecipesSerializer(instance, context={
@@ -238,10 +308,45 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 class ShowFavoriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
-        fields = ['id', 'name', 'image', 'cooking_time']
+        fields = [
+            'id', 'name', 'image', 'thumbnail', 'image_webp', 'cooking_time'
+        ]
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE,
+    )
+
+    def validate_recipes(self, value):
+        ids = set(value)
+        found = Recipe.objects.filter(pk__in=ids).only(
+            *ShowFavoriteSerializer.Meta.fields
+        )
+        missing = ids - {recipe.id for recipe in found}
+        if missing:
+            raise ValidationError(
+                f'Recipes do not exist: {sorted(missing)}'
+            )
+        return list(found)
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_PANTRY_SIZE,
+    )
+    min_coverage = serializers.FloatField(
+        min_value=0, max_value=1, default=0
+    )
 
 
 class ShoppingCartSerializer(serializers.ModelSerializer):
+    already_added_message = 'Recipe already added to cart'
+
     class Meta:
         model = ShoppingCart
         fields = ['user', 'recipe']
@@ -249,9 +354,7 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
     def validate(self, data):
         user = data['user']
         if user.shopping_cart.filter(recipe=data['recipe']).exists():
-            raise serializers.ValidationError(
-                'Recipe already added to cart'
-            )
+            raise serializers.ValidationError(self.already_added_message)
         return data
 
     def to_representation(self, instance):
@@ -261,6 +364,8 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
+    already_added_message = 'The recipe has already been added to favorites'
+
     class Meta:
         model = Favorite
         fields = ['user', 'recipe']
@@ -268,9 +373,7 @@ class FavoriteSerializer(serializers.ModelSerializer):
     def validate(self, data):
         user = data['user']
         if user.favorite.filter(recipe=data['recipe']).exists():
-            raise serializers.ValidationError(
-                'The recipe has already been added to favorites'
-            )
+            raise serializers.ValidationError(self.already_added_message)
         return data
 
     def to_representation(self, instance):
@@ -0,0 +1,81 @@
+import csv
+import os
+import tempfile
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+PDF_FONT_NAME = 'ShoppingList'
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+PDF_LINE_HEIGHT = 18
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def format_line(ingredient):
+    return (
+        f"{ingredient['ingredient__name']}: "
+        f"{ingredient['total']} "
+        f"{ingredient['ingredient__measurement_unit']}"
+    )
+
+
+def generate_text(ingredients):
+    for ingredient in ingredients:
+        yield f'{format_line(ingredient)}\n'
+
+
+class Echo:
+    """File-like object handing each written CSV row back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def generate_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ingredient', 'Amount', 'Measurement unit'))
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['total'],
+            ingredient['ingredient__measurement_unit'],
+        ))
+
+
+def get_pdf_font():
+    font_path = settings.SHOPPING_LIST_PDF_FONT
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    if font_path and os.path.exists(font_path):
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+        return PDF_FONT_NAME
+    return 'Helvetica'
+
+
+def generate_pdf(ingredients):
+    """Draw the list page by page into a file spooled to disk when large.
+
+    reportlab assembles the document only on save, so the output goes to a
+    spooled temporary file which the caller streams back in chunks.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    pdf = canvas.Canvas(output, pagesize=A4)
+    font = get_pdf_font()
+    width, height = A4
+    top = height - PDF_MARGIN
+    y = top
+    pdf.setFont(font, PDF_FONT_SIZE)
+    for ingredient in ingredients:
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(font, PDF_FONT_SIZE)
+            y = top
+        pdf.drawString(PDF_MARGIN, y, format_line(ingredient))
+        y -= PDF_LINE_HEIGHT
+    pdf.save()
+    output.seek(0)
+    return output
@@ -0,0 +1,70 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from recipes.signals import recipe_changed
+from users.models import User
+from .caching import bump_generation_on_commit
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def invalidate_recipe(pk):
+    bump_generation_on_commit(f'recipe:{pk}')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    bump_generation_on_commit('tags')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs):
+    bump_generation_on_commit('ingredients')
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_saved_recipe(sender, instance, **kwargs):
+    invalidate_recipe(instance.pk)
+
+
+# Ingredient rows are deleted only together with a save of their recipe
+# (API and admin inline). A delete receiver here would stop Django from
+# fast-deleting them.
+@receiver(post_save, sender=IngredientRecipe)
+def invalidate_recipe_ingredients(sender, instance, **kwargs):
+    invalidate_recipe(instance.recipe_id)
+
+
+@receiver(recipe_changed)
+def invalidate_changed_recipe(sender, recipe_id, **kwargs):
+    invalidate_recipe(recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_recipe(instance.pk)
+    elif pk_set is None:
+        bump_generation_on_commit('tags')
+    else:
+        for pk in pk_set:
+            invalidate_recipe(pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(sender, instance, created, update_fields,
+                              **kwargs):
+    # Logins save last_login only, which recipes do not show.
+    if created or (
+        update_fields is not None and not AUTHOR_FIELDS & set(update_fields)
+    ):
+        return
+    for pk in instance.recipes.values_list('id', flat=True):
+        invalidate_recipe(pk)
@@ -0,0 +1,83 @@
+import pytest
+from django.test import Client
+
+from recipes.models import Favorite, ShoppingCart, ShoppingCartIngredient
+
+
+@pytest.fixture
+def admin_client(make_user):
+    admin = make_user('admin')
+    admin.is_staff = admin.is_superuser = True
+    admin.save()
+    client = Client()
+    client.force_login(admin)
+    return client
+
+
+@pytest.fixture
+def soup(make_recipe, author):
+    return make_recipe(author, 'Soup', {0: 100, 1: 50})
+
+
+def totals(user):
+    return dict(ShoppingCartIngredient.objects.filter(
+        user=user
+    ).values_list('ingredient', 'total'))
+
+
+@pytest.mark.parametrize('model, counter', (
+    (Favorite, 'favorites_count'),
+    (ShoppingCart, 'in_carts_count'),
+))
+def test_admin_add_and_delete_keep_counters(
+    admin_client, user, soup, model, counter
+):
+    url = f'/admin/recipes/{model._meta.model_name}/'
+    response = admin_client.post(
+        f'{url}add/', {'user': user.id, 'recipe': soup.id}
+    )
+    assert response.status_code == 302
+    soup.refresh_from_db()
+    assert getattr(soup, counter) == 1
+    if model is ShoppingCart:
+        assert sum(totals(user).values()) == 150
+    row = model.objects.get()
+    response = admin_client.post(f'{url}{row.id}/delete/', {'post': 'yes'})
+    assert response.status_code == 302
+    assert not model.objects.exists()
+    soup.refresh_from_db()
+    assert getattr(soup, counter) == 0
+    assert totals(user) == {}
+
+
+def test_admin_bulk_delete_keeps_counters(admin_client, user, author, soup):
+    ShoppingCart.objects.add(user.id, [soup.id])
+    ShoppingCart.objects.add(author.id, [soup.id])
+    response = admin_client.post('/admin/recipes/shoppingcart/', {
+        'action': 'delete_selected',
+        'post': 'yes',
+        '_selected_action': ShoppingCart.objects.values_list('id', flat=True),
+    })
+    assert response.status_code == 302
+    soup.refresh_from_db()
+    assert soup.in_carts_count == 0
+    assert totals(user) == totals(author) == {}
+
+
+def test_admin_cannot_move_an_existing_row(
+    admin_client, user, author, soup, make_recipe
+):
+    stew = make_recipe(author, 'Stew', {2: 10})
+    ShoppingCart.objects.add(user.id, [soup.id])
+    row = ShoppingCart.objects.get()
+    url = f'/admin/recipes/shoppingcart/{row.id}/change/'
+    form = admin_client.get(url).context['adminform'].form
+    assert 'user' not in form.fields and 'recipe' not in form.fields
+    response = admin_client.post(url, {'user': author.id, 'recipe': stew.id})
+    assert response.status_code == 302
+    row.refresh_from_db()
+    assert (row.user_id, row.recipe_id) == (user.id, soup.id)
+    soup.refresh_from_db()
+    stew.refresh_from_db()
+    assert (soup.in_carts_count, stew.in_carts_count) == (1, 0)
+    assert sum(totals(user).values()) == 150
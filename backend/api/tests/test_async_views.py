@@ -0,0 +1,89 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, ShoppingCart
+
+# The async views query from worker threads, which only see committed data.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def token(user):
+    return f'Token {Token.objects.create(user=user).key}'
+
+
+async def asgi_get(client, url, **headers):
+    return await client.get(url, **headers)
+
+
+@pytest.fixture
+def get_both(token):
+    """GET a URL through the WSGI and the ASGI stack."""
+    sync_client, async_client = APIClient(), AsyncClient()
+
+    def get_both(url, authenticated=True, **headers):
+        sync_headers = {
+            f'HTTP_{name.upper().replace("-", "_")}': value
+            for name, value in headers.items()
+        }
+        if authenticated:
+            headers['authorization'] = token
+            sync_headers['HTTP_AUTHORIZATION'] = token
+        return (
+            sync_client.get(url, **sync_headers),
+            async_to_sync(asgi_get)(async_client, url, **headers),
+        )
+    return get_both
+
+
+@pytest.fixture
+def recipes(author, user, make_recipe):
+    soup = make_recipe(author, 'Soup', tag_count=2)
+    stew = make_recipe(author, 'Stew')
+    make_recipe(author, 'Soup pie', {1: 5, 2: 10})
+    Favorite.objects.add(user.id, [soup.id])
+    ShoppingCart.objects.add(user.id, [stew.id])
+    return soup, stew
+
+
+@pytest.mark.parametrize('url', (
+    '/api/recipes/',
+    '/api/recipes/?limit=2&page=2',
+    '/api/recipes/?limit=2&cursor=',
+    '/api/recipes/?ordering=-favorites_count&limit=1&cursor=',
+    '/api/recipes/?search=soup',
+    '/api/recipes/?tags=tag-1&is_favorited=1',
+    '/api/recipes/?page=9',
+    '/api/ingredients/',
+    '/api/ingredients/?name=ingredient&limit=2',
+    '/api/tags/',
+))
+@pytest.mark.parametrize('authenticated', (False, True))
+def test_async_views_answer_like_the_sync_views(
+    get_both, recipes, url, authenticated
+):
+    sync, asynchronous = get_both(url, authenticated)
+    assert asynchronous.status_code == sync.status_code
+    assert asynchronous['Content-Type'] == sync['Content-Type']
+    assert asynchronous.json() == sync.json()
+
+
+def test_async_recipe_detail_answers_like_the_sync_view(get_both, recipes):
+    soup, _ = recipes
+    sync, asynchronous = get_both(f'/api/recipes/{soup.id}/')
+    assert asynchronous.status_code == sync.status_code == 200
+    assert asynchronous.json() == sync.json()
+    assert asynchronous.json()['is_favorited'] is True
+
+
+@pytest.mark.parametrize('url', ('/api/tags/', '/api/ingredients/?name=in'))
+def test_async_lists_share_the_cached_response_and_etag(
+    get_both, tags, ingredients, url
+):
+    sync, asynchronous = get_both(url)
+    assert asynchronous['ETag'] == sync['ETag']
+    _, not_modified = get_both(url, **{'if-none-match': sync['ETag']})
+    assert not_modified.status_code == 304
@@ -0,0 +1,81 @@
+import pytest
+
+from recipes.cookable_index import cookable_index
+
+URL = '/api/recipes/cookable/'
+
+
+def matches(response):
+    assert response.status_code == 200
+    return [
+        (recipe['name'], recipe['coverage'], recipe['missing_ingredients'])
+        for recipe in response.json()['results']
+    ]
+
+
+@pytest.fixture
+def recipes(author, make_recipe):
+    return {
+        name: make_recipe(author, name, dict.fromkeys(indexes, 10))
+        for name, indexes in (
+            ('Soup', (0, 1)),
+            ('Stew', (0, 2)),
+            ('Pie', (0, 1, 2, 3)),
+            ('Cake', (4,)),
+        )
+    }
+
+
+def pantry(ingredients, *indexes):
+    return [ingredients[index].id for index in indexes]
+
+
+def test_recipes_are_ranked_by_coverage(
+    anonymous_client, recipes, ingredients
+):
+    response = anonymous_client.get(
+        URL, {'ingredients': pantry(ingredients, 0, 1, 5)}
+    )
+    assert matches(response) == [
+        ('Soup', 1.0, 0), ('Stew', 0.5, 1), ('Pie', 0.5, 2)
+    ]
+    response = anonymous_client.get(URL, {
+        'ingredients': pantry(ingredients, 0, 1), 'min_coverage': 0.75
+    })
+    assert matches(response) == [('Soup', 1.0, 0)]
+
+
+@pytest.mark.parametrize('query', (
+    {},
+    {'ingredients': 'salt'},
+    {'ingredients': 1, 'min_coverage': 2},
+))
+def test_invalid_queries_are_rejected(anonymous_client, query):
+    assert anonymous_client.get(URL, query).status_code == 400
+
+
+def test_matching_does_not_query_after_the_build(
+    recipes, ingredients, django_assert_num_queries
+):
+    cookable_index.match(pantry(ingredients, 0))
+    with django_assert_num_queries(0):
+        assert len(cookable_index.match(pantry(ingredients, 0))) == 3
+
+
+def test_index_follows_recipe_changes(
+    api_client, author, recipes, ingredients,
+    django_capture_on_commit_callbacks
+):
+    query = {'ingredients': pantry(ingredients, 4, 5)}
+    assert matches(api_client.get(URL, query)) == [('Cake', 1.0, 0)]
+    api_client.force_authenticate(author)
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.patch(f'/api/recipes/{recipes["Stew"].id}/', {
+            'ingredients': [
+                {'id': ingredients[4].id, 'amount': 1},
+                {'id': ingredients[0].id, 'amount': 1},
+            ],
+        }, format='json')
+        assert response.status_code == 200
+        recipes['Cake'].delete()
+    assert matches(api_client.get(URL, query)) == [('Stew', 0.5, 1)]
@@ -0,0 +1,90 @@
+from recipes.counters import recalculate_counters
+from recipes.models import Recipe
+from users.models import User
+
+
+def counters():
+    return (
+        set(Recipe.objects.values_list(
+            'id', 'favorites_count', 'in_carts_count'
+        )),
+        set(User.objects.values_list(
+            'id', 'recipes_count', 'followers_count'
+        )),
+    )
+
+
+def test_counters_match_a_recount(
+    api_client, user, author, make_user, make_recipe, tags, ingredients
+):
+    soup = make_recipe(author, 'Soup')
+    stew = make_recipe(author, 'Stew')
+    pie = make_recipe(make_user('baker'), 'Pie')
+    api_client.post(f'/api/recipes/{soup.id}/favorite/')
+    api_client.post(f'/api/recipes/{soup.id}/shopping_cart/')
+    api_client.post(
+        '/api/recipes/favorite/', {'recipes': [stew.id, pie.id]},
+        format='json',
+    )
+    api_client.post(
+        '/api/recipes/shopping_cart/', {'recipes': [stew.id, pie.id]},
+        format='json',
+    )
+    api_client.delete(
+        '/api/recipes/favorite/', {'recipes': [pie.id]}, format='json'
+    )
+    api_client.post(f'/api/users/{author.id}/subscribe/')
+    response = api_client.post('/api/recipes/', {
+        'ingredients': [{'id': ingredients[0].id, 'amount': 10}],
+        'tags': [tags[0].id],
+        'image': (
+            'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAf'
+            'FcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+        ),
+        'name': 'Salad',
+        'text': 'Salad',
+        'cooking_time': 5,
+    }, format='json')
+    assert response.status_code == 201
+    api_client.force_authenticate(author)
+    api_client.delete(f'/api/recipes/{stew.id}/')
+    maintained = counters()
+    recalculate_counters()
+    assert counters() == maintained
+    soup.refresh_from_db()
+    assert (soup.favorites_count, soup.in_carts_count) == (1, 1)
+
+
+def test_counters_survive_deleting_a_user(
+    api_client, user, author, make_user, make_recipe
+):
+    soup = make_recipe(author, 'Soup')
+    stew = make_recipe(author, 'Stew')
+    baker = make_user('baker')
+    for client_user in (user, baker):
+        api_client.force_authenticate(client_user)
+        api_client.post(
+            '/api/recipes/favorite/', {'recipes': [soup.id, stew.id]},
+            format='json',
+        )
+        api_client.post(f'/api/recipes/{soup.id}/shopping_cart/')
+    baker.delete()
+    maintained = counters()
+    recalculate_counters()
+    assert counters() == maintained
+    soup.refresh_from_db()
+    assert (soup.favorites_count, soup.in_carts_count) == (1, 1)
+
+
+def test_adding_twice_counts_once(api_client, author, make_recipe):
+    soup = make_recipe(author, 'Soup')
+    assert api_client.post(
+        f'/api/recipes/{soup.id}/favorite/'
+    ).status_code == 201
+    response = api_client.post(f'/api/recipes/{soup.id}/favorite/')
+    assert response.status_code == 400
+    assert response.json() == {'non_field_errors': [
+        'The recipe has already been added to favorites'
+    ]}
+    soup.refresh_from_db()
+    assert soup.favorites_count == 1
@@ -0,0 +1,72 @@
+import base64
+import io
+import json
+
+import pytest
+from PIL import Image
+
+from recipes.models import Recipe
+
+
+def data_uri(content, header='data:image/png'):
+    return f'{header};base64,{base64.b64encode(content).decode()}'
+
+
+def png():
+    output = io.BytesIO()
+    Image.new('RGB', (2, 2)).save(output, 'PNG')
+    return output.getvalue()
+
+
+@pytest.fixture
+def post_records(api_client, tags, ingredients):
+    def post_records(*images):
+        body = '\n'.join(
+            json.dumps({
+                'name': f'Imported {number}',
+                'text': 'Imported',
+                'cooking_time': 5,
+                'image': image,
+                'tags': [tags[0].slug],
+                'ingredients': [{
+                    'name': ingredients[0].name,
+                    'measurement_unit': ingredients[0].measurement_unit,
+                    'amount': 1,
+                }],
+            })
+            for number, image in enumerate(images)
+        )
+        return api_client.post(
+            '/api/recipes/import/', body, content_type='application/x-ndjson'
+        )
+    return post_records
+
+
+def test_import_names_images_after_their_content(post_records, settings):
+    response = post_records(data_uri(png(), 'data:image/html'))
+    assert response.status_code == 201
+    image = Recipe.objects.get(name='Imported 0').image
+    assert image.name.endswith('.png')
+    assert (settings.MEDIA_ROOT / image.name).exists()
+
+
+def test_import_rejects_content_that_is_no_image(post_records, settings):
+    response = post_records(
+        data_uri(b'<script>alert(1)</script>', 'data:image/html')
+    )
+    assert response.status_code == 400
+    assert response.json()['errors'] == [
+        {'line': 1, 'error': 'image is not a valid image'}
+    ]
+    assert not any(settings.MEDIA_ROOT.rglob('*.*'))
+
+
+def test_import_rejects_storage_paths_over_the_api(
+    post_records, author, make_recipe
+):
+    other = make_recipe(author, 'Soup')
+    response = post_records(other.image.name)
+    assert response.status_code == 400
+    assert response.json()['errors'] == [
+        {'line': 1, 'error': 'image must be a base64 data URI'}
+    ]
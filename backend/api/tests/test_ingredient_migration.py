@@ -0,0 +1,77 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+BEFORE = [('recipes', '0013_similarrecipes')]
+AFTER = [('recipes', '0015_ingredient_unique')]
+
+
+@pytest.fixture
+def migrate(transactional_db):
+    """Migrate recipes to a target and back to the latest state after."""
+    def migrate(targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+    yield migrate
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+def test_unique_migration_merges_duplicate_ingredients(migrate):
+    apps = migrate(BEFORE)
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    ShoppingCartIngredient = apps.get_model(
+        'recipes', 'ShoppingCartIngredient'
+    )
+    User = apps.get_model('users', 'User')
+    user = User.objects.create(username='user', email='user@example.com')
+    salt, *salt_copies = (
+        Ingredient.objects.create(name='salt', measurement_unit='g')
+        for _ in range(3)
+    )
+    pepper = Ingredient.objects.create(name='pepper', measurement_unit='g')
+    salt_in_pieces = Ingredient.objects.create(
+        name='salt', measurement_unit='pcs'
+    )
+    soup, stew = (
+        Recipe.objects.create(
+            author=user, name=name, text=name, cooking_time=1, image='x.png'
+        )
+        for name in ('Soup', 'Stew')
+    )
+    IngredientRecipe.objects.bulk_create([
+        IngredientRecipe(recipe=soup, ingredient=salt, amount=2),
+        IngredientRecipe(recipe=soup, ingredient=salt_copies[0], amount=3),
+        IngredientRecipe(recipe=soup, ingredient=pepper, amount=1),
+        IngredientRecipe(recipe=stew, ingredient=salt_copies[1], amount=4),
+        IngredientRecipe(recipe=stew, ingredient=salt_in_pieces, amount=1),
+    ])
+    ShoppingCartIngredient.objects.bulk_create([
+        ShoppingCartIngredient(user=user, ingredient=salt_copies[0], total=3),
+        ShoppingCartIngredient(user=user, ingredient=salt_copies[1], total=4),
+    ])
+
+    apps = migrate(AFTER)
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    ShoppingCartIngredient = apps.get_model(
+        'recipes', 'ShoppingCartIngredient'
+    )
+    assert set(Ingredient.objects.values_list('id', flat=True)) == {
+        salt.id, pepper.id, salt_in_pieces.id
+    }
+    assert set(IngredientRecipe.objects.values_list(
+        'recipe', 'ingredient', 'amount'
+    )) == {
+        (soup.id, salt.id, 5),
+        (soup.id, pepper.id, 1),
+        (stew.id, salt.id, 4),
+        (stew.id, salt_in_pieces.id, 1),
+    }
+    assert list(ShoppingCartIngredient.objects.values_list(
+        'user', 'ingredient', 'total'
+    )) == [(user.id, salt.id, 7)]
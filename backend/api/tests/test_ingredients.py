@@ -0,0 +1,62 @@
+import pytest
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+
+@pytest.fixture
+def pantry(db):
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit='g')
+        for name in ('sugar', 'Salt', 'pepper', 'salted butter', 'Sage')
+    )
+
+
+def names(response):
+    assert response.status_code == 200
+    return [ingredient['name'] for ingredient in response.json()]
+
+
+def test_prefix_search_ignores_case(anonymous_client, pantry):
+    assert names(anonymous_client.get('/api/ingredients/?name=SAL')) == [
+        'Salt', 'salted butter'
+    ]
+    assert names(anonymous_client.get('/api/ingredients/?name=x')) == []
+    assert names(anonymous_client.get('/api/ingredients/')) == [
+        'pepper', 'Sage', 'Salt', 'salted butter', 'sugar'
+    ]
+
+
+@pytest.mark.parametrize('limit, expected', (
+    ('2', ['Sage', 'Salt']),
+    ('10', ['Sage', 'Salt', 'salted butter', 'sugar']),
+    ('', ['Sage', 'Salt', 'salted butter', 'sugar']),
+    ('many', ['Sage', 'Salt', 'salted butter', 'sugar']),
+))
+def test_limit_caps_the_matches(anonymous_client, pantry, limit, expected):
+    response = anonymous_client.get(f'/api/ingredients/?name=s&limit={limit}')
+    assert names(response) == expected
+
+
+def test_search_does_not_query_after_the_build(
+    pantry, django_assert_num_queries
+):
+    ingredient_index.search('s')
+    with django_assert_num_queries(0):
+        assert [item['name'] for item in ingredient_index.search('S', 1)] == [
+            'Sage'
+        ]
+
+
+def test_index_follows_ingredient_changes(
+    anonymous_client, pantry, django_capture_on_commit_callbacks
+):
+    assert names(anonymous_client.get('/api/ingredients/?name=sa')) == [
+        'Sage', 'Salt', 'salted butter'
+    ]
+    with django_capture_on_commit_callbacks(execute=True):
+        Ingredient.objects.create(name='Saffron', measurement_unit='g')
+        Ingredient.objects.get(name='Salt').delete()
+    assert names(anonymous_client.get('/api/ingredients/?name=sa')) == [
+        'Saffron', 'Sage', 'salted butter'
+    ]
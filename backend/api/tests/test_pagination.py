@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from recipes.models import Recipe
+from users.models import Subscribe
+
+
+def walk(client, url):
+    """Follow the ``next`` links from ``url`` and collect the results."""
+    results, seen = [], set()
+    while url:
+        assert url not in seen, 'the cursor did not advance'
+        seen.add(url)
+        response = client.get(url)
+        assert response.status_code == 200
+        results += response.json()['results']
+        url = response.json()['next']
+    return results
+
+
+def test_recipe_cursor_returns_every_recipe_once(
+    api_client, author, make_recipe
+):
+    recipes = [make_recipe(author, f'Recipe {i}') for i in range(11)]
+    # Ties on pub_date are broken by id.
+    now = timezone.now()
+    for position, recipe in enumerate(recipes):
+        Recipe.objects.filter(pk=recipe.pk).update(
+            pub_date=now - timedelta(minutes=position // 3)
+        )
+    results = walk(api_client, '/api/recipes/?limit=4&cursor=')
+    assert [recipe['id'] for recipe in results] == list(
+        Recipe.objects.order_by('-pub_date', '-id').values_list(
+            'id', flat=True
+        )
+    )
+
+
+def test_recipe_cursor_keeps_filters(api_client, author, make_recipe, tags):
+    for i in range(5):
+        make_recipe(author, f'Tagged {i}', tag_count=2)
+        make_recipe(author, f'Other {i}')
+    results = walk(
+        api_client, f'/api/recipes/?limit=2&cursor=&tags={tags[1].slug}'
+    )
+    assert len(results) == 5
+    assert [recipe['id'] for recipe in results] == list(
+        Recipe.objects.filter(tags=tags[1]).order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True)
+    )
+
+
+def test_recipe_cursor_keeps_the_requested_ordering(
+    api_client, author, make_recipe
+):
+    recipes = [make_recipe(author, f'Recipe {i}') for i in range(7)]
+    for recipe in recipes:
+        Recipe.objects.filter(pk=recipe.pk).update(
+            favorites_count=recipe.pk % 3
+        )
+    url = '/api/recipes/?limit=3&ordering=-favorites_count'
+    expected = [
+        recipe['id'] for recipe in api_client.get(
+            url.replace('limit=3', 'limit=10')
+        ).json()['results']
+    ]
+    results = walk(api_client, f'{url}&cursor=')
+    assert [recipe['id'] for recipe in results] == expected
+    assert expected == list(Recipe.objects.order_by(
+        '-favorites_count', '-id'
+    ).values_list('id', flat=True))
+
+
+def test_recipe_cursor_keeps_the_search_rank(
+    api_client, author, make_recipe
+):
+    for i in range(3):
+        make_recipe(author, f'Soup {i}')
+        make_recipe(author, f'Stew {i}')
+        stew = Recipe.objects.filter(name=f'Stew {i}')
+        stew.update(text='soup ' * (i + 1))
+        stew.update_search_vector()
+    url = '/api/recipes/?limit=2&search=soup'
+    expected = [
+        recipe['id'] for recipe in api_client.get(
+            url.replace('limit=2', 'limit=10')
+        ).json()['results']
+    ]
+    assert len(expected) == 6
+    results = walk(api_client, f'{url}&cursor=')
+    assert [recipe['id'] for recipe in results] == expected
+
+
+def test_subscription_cursor_returns_every_author_once(
+    api_client, user, make_user
+):
+    authors = [make_user(f'author{i}') for i in range(7)]
+    Subscribe.objects.bulk_create(
+        Subscribe(user=user, author=author) for author in authors
+    )
+    results = walk(api_client, '/api/users/subscriptions/?limit=3&cursor=')
+    assert [author['username'] for author in results] == sorted(
+        author.username for author in authors
+    )
+
+
+def test_invalid_cursor_is_not_found(api_client):
+    response = api_client.get('/api/recipes/?cursor=not-a-cursor')
+    assert response.status_code == 404
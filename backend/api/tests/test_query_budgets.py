@@ -0,0 +1,29 @@
+import io
+
+from api.management.commands.benchmark_api import Command
+
+SEED = {
+    'users': 100,
+    'recipes': 200,
+    'ingredients': 100,
+    'ingredients_per_recipe': 6,
+    'tags': 5,
+    'tags_per_recipe': 2,
+    'relations_per_user': 3,
+    'seed': 0,
+}
+
+
+def test_endpoints_stay_within_query_budget(transactional_db, settings):
+    """Every endpoint of benchmark_api keeps to its query budget.
+
+    List endpoints are requested with a small and a large page and must
+    issue the same number of queries for both. The test runs outside a
+    wrapping transaction, like the command, so atomic blocks add no
+    savepoint queries and after-commit hooks run.
+    """
+    settings.REPLICA_DATABASES = []
+    benchmark = Command(stdout=io.StringIO())
+    benchmark.seed(SEED)
+    failures = benchmark.run_benchmarks(repeat=1)
+    assert not failures, '\n'.join(failures)
@@ -0,0 +1,75 @@
+import pytest
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscribe
+
+FLAGS = ('is_favorited', 'is_in_shopping_cart')
+
+
+@pytest.mark.parametrize('detail_cache', (False, True))
+def test_detail_overlays_the_user_flags(
+    settings, detail_cache, api_client, anonymous_client, user, author,
+    make_user, make_recipe
+):
+    settings.RECIPE_DETAIL_CACHE = detail_cache
+    recipe = make_recipe(author, 'Soup')
+    Favorite.objects.add(user.id, [recipe.id])
+    ShoppingCart.objects.add(user.id, [recipe.id])
+    Subscribe.objects.create(user=user, author=author)
+    url = f'/api/recipes/{recipe.id}/'
+    # The anonymous request fills the cache the user's request reads.
+    anonymous = anonymous_client.get(url).json()
+    own = api_client.get(url).json()
+    api_client.force_authenticate(make_user('stranger'))
+    stranger = api_client.get(url).json()
+
+    assert [anonymous[flag] for flag in FLAGS] == [False, False]
+    assert anonymous['author']['is_subscribed'] is False
+    assert [own[flag] for flag in FLAGS] == [True, True]
+    assert own['author']['is_subscribed'] is True
+    assert stranger == anonymous
+    for flag in FLAGS:
+        own.pop(flag)
+        anonymous.pop(flag)
+    own['author'].pop('is_subscribed')
+    anonymous['author'].pop('is_subscribed')
+    assert own == anonymous
+
+
+def test_detail_of_missing_recipe_is_not_found(api_client):
+    assert api_client.get('/api/recipes/999/').status_code == 404
+
+
+@pytest.mark.parametrize('renderer, accept', (
+    ('orjson', 'application/json'),
+    ('fallback', 'application/json'),
+    ('orjson', 'application/json; indent=4'),
+))
+def test_detail_offsets_follow_an_author_change(
+    settings, monkeypatch, django_capture_on_commit_callbacks, renderer,
+    accept, api_client, anonymous_client, user, author, make_recipe
+):
+    settings.RECIPE_DETAIL_CACHE = True
+    if renderer == 'fallback':
+        # FastJSONRenderer hands everything to JSONRenderer without orjson.
+        monkeypatch.setattr('api.renderers.orjson', None)
+    recipe = make_recipe(author, 'Soup')
+    Favorite.objects.add(user.id, [recipe.id])
+    url = f'/api/recipes/{recipe.id}/'
+    assert anonymous_client.get(url, HTTP_ACCEPT=accept).json()[
+        'is_favorited'
+    ] is False
+    with django_capture_on_commit_callbacks(execute=True):
+        author.first_name = 'A much longer first name'
+        author.save()
+    response = api_client.get(url, HTTP_ACCEPT=accept)
+    if 'indent' in accept:
+        assert b'\n    "is_favorited": true' in response.content
+    data = response.json()
+    assert data['author']['first_name'] == 'A much longer first name'
+    assert [data[flag] for flag in FLAGS] == [True, False]
+    assert data['author']['is_subscribed'] is False
+    anonymous = anonymous_client.get(url, HTTP_ACCEPT=accept).json()
+    assert anonymous['author']['first_name'] == 'A much longer first name'
+    data['is_favorited'] = False
+    assert data == anonymous
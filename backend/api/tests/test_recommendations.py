@@ -0,0 +1,90 @@
+import pytest
+from django.core.management import call_command
+
+from recipes.models import Favorite, Recipe, ShoppingCart, SimilarRecipes
+
+pytest.importorskip('scipy')
+
+
+def names(response):
+    assert response.status_code == 200
+    return [recipe['name'] for recipe in response.json()['results']]
+
+
+@pytest.fixture
+def recipes(user, author, make_user, make_recipe):
+    """Apple is saved with Bread by two users and with Cake by one."""
+    recipes = {
+        name: make_recipe(author, name)
+        for name in ('Apple', 'Bread', 'Cake', 'Dumplings')
+    }
+    recipes['Own'] = make_recipe(user, 'Own')
+    saves = {
+        'first': ('Apple', 'Bread', 'Own'),
+        'second': ('Apple', 'Bread', 'Own'),
+        'third': ('Apple', 'Cake'),
+        'fourth': ('Dumplings',),
+    }
+    for username, saved in saves.items():
+        Favorite.objects.add(
+            make_user(username).id, [recipes[name].id for name in saved]
+        )
+    return recipes
+
+
+def build():
+    call_command('build_recommendations', ingredient_weight=0)
+
+
+def test_recommends_recipes_saved_together(api_client, user, recipes):
+    ShoppingCart.objects.add(user.id, [recipes['Apple'].id])
+    build()
+    # Apple is in the cart and Own is the user's own recipe.
+    assert names(api_client.get('/api/recipes/recommended/')) == [
+        'Bread', 'Cake'
+    ]
+
+
+def test_neighbours_are_stored_best_first(recipes):
+    build()
+    neighbours = list(SimilarRecipes.objects.get(
+        recipe=recipes['Apple']
+    ).neighbours())
+    assert [recipe_id for recipe_id, _ in neighbours] == [
+        recipes['Bread'].id, recipes['Own'].id, recipes['Cake'].id
+    ]
+    scores = [score for _, score in neighbours]
+    assert scores == sorted(scores, reverse=True)
+    # Cosine over users: two shared savers of three and two.
+    assert scores[0] == pytest.approx(2 / 6 ** 0.5, rel=1e-6)
+    assert not SimilarRecipes.objects.filter(
+        recipe=recipes['Dumplings']
+    ).exists()
+
+
+def test_shared_ingredients_make_recipes_similar(
+    api_client, user, author, make_recipe
+):
+    soup = make_recipe(author, 'Soup', {0: 1, 1: 1})
+    make_recipe(author, 'Stew', {1: 1, 2: 1})
+    for name, index in (('Pie', 3), ('Cake', 4), ('Bun', 5)):
+        make_recipe(author, name, {index: 1})
+    Favorite.objects.add(user.id, [soup.id])
+    call_command(
+        'build_recommendations', ingredient_weight=1, max_ingredient_share=0.5
+    )
+    assert names(api_client.get('/api/recipes/recommended/')) == ['Stew']
+
+
+def test_without_saves_the_most_favorited_come_first(
+    api_client, anonymous_client, recipes
+):
+    build()
+    expected = list(Recipe.objects.order_by(
+        '-favorites_count', '-id'
+    ).values_list('name', flat=True))
+    assert expected[0] == 'Apple'
+    assert names(anonymous_client.get('/api/recipes/recommended/')) == (
+        expected
+    )
+    assert names(api_client.get('/api/recipes/recommended/')) == expected
@@ -0,0 +1,66 @@
+import pytest
+from django.db import transaction
+
+from api.caching import get_generation
+from recipes.models import Ingredient, Tag
+
+
+@pytest.mark.parametrize('url', ('/api/tags/', '/api/ingredients/?name=in'))
+def test_lists_answer_if_none_match_with_304(
+    anonymous_client, tags, ingredients, url
+):
+    response = anonymous_client.get(url)
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert etag.startswith('"') and etag.endswith('"')
+    assert 'no-cache' in response['Cache-Control']
+    response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response['ETag'] == etag
+    response = anonymous_client.get(url, HTTP_IF_NONE_MATCH='"other"')
+    assert response.status_code == 200
+
+
+def test_a_change_gives_the_list_a_new_etag(
+    anonymous_client, tags, django_capture_on_commit_callbacks
+):
+    first = anonymous_client.get('/api/tags/')
+    assert anonymous_client.get('/api/tags/')['ETag'] == first['ETag']
+    with django_capture_on_commit_callbacks(execute=True):
+        tags[0].delete()
+        tags[1].name = 'Renamed'
+        tags[1].save()
+    response = anonymous_client.get('/api/tags/')
+    assert response['ETag'] != first['ETag']
+    assert {tag['name'] for tag in response.json()} == {'Renamed', 'Tag 2'}
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('model, namespace, fields', (
+    (Tag, 'tags', {'name': 'New', 'slug': 'new', 'color': '#00FF00'}),
+    (Ingredient, 'ingredients', {'name': 'new', 'measurement_unit': 'g'}),
+))
+def test_generation_is_bumped_after_commit(model, namespace, fields):
+    generation = get_generation(namespace)
+    with transaction.atomic():
+        instance = model.objects.create(**fields)
+        # A reader before the commit still sees the old rows, so it must
+        # not cache them under a new generation.
+        assert get_generation(namespace) == generation
+    assert get_generation(namespace) != generation
+    generation = get_generation(namespace)
+    instance.delete()
+    assert get_generation(namespace) != generation
+
+
+@pytest.mark.django_db(databases=('default', 'replica1'))
+def test_cached_lists_render_from_primary(settings, anonymous_client, tags):
+    settings.REPLICA_DATABASES = ['replica1']
+    Tag.objects.using('replica1').create(
+        name='Replica tag', slug='replica', color='#0000FF'
+    )
+    response = anonymous_client.get('/api/tags/')
+    assert [tag['name'] for tag in response.json()] == [
+        tag.name for tag in tags
+    ]
@@ -0,0 +1,67 @@
+import datetime
+import json
+import decimal
+import uuid
+from collections import OrderedDict
+
+import pytest
+from django.core.cache import cache
+from django.utils.functional import lazy
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer
+
+lazy_str = lazy(str, str)
+
+PAYLOADS = {
+    'scalars': [None, True, 0, -1, 2 ** 40, 1.5, 0.1, 'text', ''],
+    'nested': OrderedDict(b=[{'x': 1}], a=OrderedDict(c=[])),
+    'unicode': {'name': 'Щи «по-русски» 🍲', 'quote': '"\\\n\t'},
+    'separators': {'text': 'line paragraph end'},
+    'non-string keys': {1: 'one', 2.5: 'two', None: 'none', True: 'yes'},
+    'encoder types': {
+        'datetime': datetime.datetime(2022, 3, 4, 5, 6, 7, 890123),
+        'aware': datetime.datetime(
+            2022, 3, 4, 5, 6, 7, tzinfo=datetime.timezone.utc
+        ),
+        'date': datetime.date(2022, 3, 4),
+        'time': datetime.time(5, 6, 7),
+        'decimal': decimal.Decimal('1.10'),
+        'uuid': uuid.UUID(int=1),
+        'set': {1},
+        'tuple': (1, 2),
+        'lazy': lazy_str('lazy'),
+    },
+}
+
+
+@pytest.mark.parametrize('data', PAYLOADS.values(), ids=PAYLOADS)
+@pytest.mark.parametrize('media_type', (
+    'application/json', 'application/json; indent=2'
+))
+def test_output_matches_json_renderer(data, media_type):
+    expected = JSONRenderer().render(data, media_type)
+    assert FastJSONRenderer().render(data, media_type) == expected
+
+
+def test_exponent_floats_parse_the_same():
+    data = [1e16, 1e-07, -2.5e300]
+    content = FastJSONRenderer().render(data)
+    assert content == b'[1e16,1e-7,-2.5e300]'
+    assert json.loads(content) == json.loads(JSONRenderer().render(data))
+
+
+@pytest.mark.parametrize('url', (
+    '/api/recipes/', '/api/ingredients/', '/api/tags/', '/api/users/',
+))
+def test_api_responses_match_json_renderer(
+    monkeypatch, api_client, author, make_recipe, url
+):
+    for name in ('Soup', 'Stew', 'Pie'):
+        make_recipe(author, name, {0: 10, 1: 20}, tag_count=2)
+    fast = api_client.get(url).content
+    # Without orjson FastJSONRenderer renders through JSONRenderer; the
+    # cached lists must be rendered again to compare.
+    monkeypatch.setattr('api.renderers.orjson', None)
+    cache.clear()
+    assert fast == api_client.get(url).content
@@ -0,0 +1,84 @@
+import pytest
+
+from recipes.models import Recipe
+from users.models import Subscribe, User
+
+pytestmark = pytest.mark.django_db(databases=('default', 'replica1'))
+
+
+@pytest.fixture
+def replica(settings):
+    """Route safe-method API reads to the replica1 SQLite database."""
+    settings.REPLICA_DATABASES = ['replica1']
+    return 'replica1'
+
+
+def make_replica_user(replica, username, **fields):
+    return User.objects.db_manager(replica).create_user(
+        username=username, email=f'{username}@example.com', **fields
+    )
+
+
+def names(response):
+    assert response.status_code == 200
+    return [recipe['name'] for recipe in response.json()['results']]
+
+
+@pytest.fixture
+def replica_recipe(replica):
+    """A recipe only the replica has, as if primary had deleted it."""
+    author = make_replica_user(replica, 'replica-author')
+    return Recipe.objects.using(replica).bulk_create([Recipe(
+        author=author,
+        name='Replica soup',
+        image='static/recipe/test.png',
+        text='Replica soup',
+        cooking_time=5,
+    )])[0]
+
+
+def test_safe_reads_go_to_the_replica(
+    settings, anonymous_client, author, make_recipe, replica_recipe
+):
+    make_recipe(author, 'Primary soup')
+    assert names(anonymous_client.get('/api/recipes/')) == ['Replica soup']
+    settings.REPLICA_DATABASES = []
+    assert names(anonymous_client.get('/api/recipes/')) == ['Primary soup']
+
+
+def test_a_write_pins_the_client_to_primary(
+    settings, api_client, author, make_recipe, replica_recipe
+):
+    recipe = make_recipe(author, 'Primary soup')
+    assert names(api_client.get('/api/recipes/')) == ['Replica soup']
+    response = api_client.post(f'/api/recipes/{recipe.id}/favorite/')
+    assert response.status_code == 201
+    cookie = response.cookies[settings.READ_YOUR_WRITES_COOKIE]
+    assert int(cookie['max-age']) == settings.READ_YOUR_WRITES_SECONDS
+    assert names(api_client.get('/api/recipes/')) == ['Primary soup']
+    api_client.cookies.clear()
+    assert names(api_client.get('/api/recipes/')) == ['Replica soup']
+
+
+def test_only_listed_actions_read_from_the_replica(
+    api_client, user, make_user, replica
+):
+    make_user('primary-author')
+    replica_user = make_replica_user(replica, 'user', id=user.id)
+    Subscribe.objects.using(replica).create(
+        user=replica_user,
+        author=make_replica_user(replica, 'replica-author'),
+    )
+    response = api_client.get('/api/users/subscriptions/')
+    assert [author['username'] for author in response.json()['results']] == [
+        'replica-author'
+    ]
+    response = api_client.get('/api/users/')
+    assert 'replica-author' not in {
+        found['username'] for found in response.json()['results']
+    }
+
+
+def test_reads_outside_requests_stay_on_primary(replica, replica_recipe):
+    assert not Recipe.objects.exists()
+    assert Recipe.objects.using(replica).exists()
@@ -0,0 +1,67 @@
+import pytest
+
+
+def names(response):
+    assert response.status_code == 200
+    return [recipe['name'] for recipe in response.json()['results']]
+
+
+@pytest.fixture
+def recipes(author, make_recipe):
+    texts = {
+        'Tomato soup': 'Tomato soup with basil. The soup is served hot.',
+        'Beef stew': 'A slow stew of beef and carrots; thicker than a soup, '
+                     'with potatoes, onions, thyme, bay leaves and wine.',
+        'Apple pie': 'Sweet apples baked in a crust.',
+    }
+    created = {}
+    for name, text in texts.items():
+        recipe = make_recipe(author, name)
+        recipe.text = text
+        recipe.save()
+        created[name] = recipe
+    return created
+
+
+@pytest.mark.parametrize('query, expected', (
+    ('soup', ['Tomato soup', 'Beef stew']),
+    ('SOUP', ['Tomato soup', 'Beef stew']),
+    ('carrot', ['Beef stew']),
+    ('app', ['Apple pie']),
+    ('soup beef', ['Beef stew']),
+    ('soup, basil!', ['Tomato soup']),
+    ('risotto', []),
+))
+def test_search_matches_every_word_as_a_prefix(
+    anonymous_client, recipes, query, expected
+):
+    response = anonymous_client.get('/api/recipes/', {'search': query})
+    assert names(response) == expected
+
+
+def test_empty_search_lists_every_recipe(anonymous_client, recipes):
+    response = anonymous_client.get('/api/recipes/', {'search': ' ,.'})
+    assert sorted(names(response)) == sorted(recipes)
+
+
+def test_search_combines_with_the_other_filters(
+    anonymous_client, recipes, make_user, make_recipe
+):
+    make_recipe(make_user('baker'), 'Onion soup')
+    author = recipes['Tomato soup'].author
+    response = anonymous_client.get(
+        '/api/recipes/', {'search': 'soup', 'author': author.id}
+    )
+    assert names(response) == ['Tomato soup', 'Beef stew']
+
+
+def test_search_follows_edits_and_deletions(anonymous_client, recipes):
+    recipes['Apple pie'].text = 'Sweet apples and pears baked in a crust.'
+    recipes['Apple pie'].save()
+    recipes['Beef stew'].delete()
+    assert names(anonymous_client.get(
+        '/api/recipes/', {'search': 'pear'}
+    )) == ['Apple pie']
+    assert names(anonymous_client.get(
+        '/api/recipes/', {'search': 'stew'}
+    )) == []
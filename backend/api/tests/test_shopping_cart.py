@@ -0,0 +1,164 @@
+import pytest
+from django.db.models import Sum
+from django.test import Client
+
+from recipes.counters import recalculate_counters
+from recipes.models import (
+    IngredientRecipe, ShoppingCart, ShoppingCartIngredient
+)
+
+
+def expected_totals(user):
+    """Ingredient totals of the user's cart summed from the recipes."""
+    return dict(
+        IngredientRecipe.objects.filter(
+            recipe__shopping_cart__user=user
+        ).values('ingredient').annotate(total=Sum('amount')).values_list(
+            'ingredient', 'total'
+        ).order_by()
+    )
+
+
+def stored_totals(user):
+    return dict(
+        ShoppingCartIngredient.objects.filter(user=user).values_list(
+            'ingredient', 'total'
+        )
+    )
+
+
+@pytest.fixture
+def recipes(make_recipe, author):
+    return (
+        make_recipe(author, 'Soup', {0: 100, 1: 50}),
+        make_recipe(author, 'Stew', {0: 30, 2: 10}),
+    )
+
+
+def test_totals_follow_cart_changes(api_client, user, recipes):
+    soup, stew = recipes
+    for recipe in (soup, stew):
+        response = api_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        assert response.status_code == 201
+    assert stored_totals(user) == expected_totals(user)
+    assert sum(stored_totals(user).values()) == 190
+    response = api_client.delete(f'/api/recipes/{soup.id}/shopping_cart/')
+    assert response.status_code == 204
+    assert stored_totals(user) == expected_totals(user)
+
+
+def test_totals_follow_batch_cart_changes(api_client, user, recipes):
+    ids = [recipe.id for recipe in recipes]
+    response = api_client.post(
+        '/api/recipes/shopping_cart/', {'recipes': ids}, format='json'
+    )
+    assert response.status_code == 201
+    assert stored_totals(user) == expected_totals(user)
+    response = api_client.delete(
+        '/api/recipes/shopping_cart/', {'recipes': ids}, format='json'
+    )
+    assert response.status_code == 204
+    assert stored_totals(user) == {}
+
+
+def test_totals_follow_recipe_deletion(
+    api_client, user, author, recipes, ingredients
+):
+    soup, stew = recipes
+    ShoppingCart.objects.add(user.id, [soup.id, stew.id])
+    api_client.force_authenticate(author)
+    response = api_client.delete(f'/api/recipes/{soup.id}/')
+    assert response.status_code == 204
+    assert stored_totals(user) == {
+        ingredients[0].id: 30, ingredients[2].id: 10
+    }
+
+
+def test_totals_follow_recipe_update(
+    api_client, user, author, recipes, ingredients
+):
+    soup, _ = recipes
+    ShoppingCart.objects.add(user.id, [soup.id])
+    api_client.force_authenticate(author)
+    response = api_client.patch(f'/api/recipes/{soup.id}/', {
+        'ingredients': [
+            {'id': ingredients[0].id, 'amount': 70},
+            {'id': ingredients[3].id, 'amount': 5},
+        ],
+    }, format='json')
+    assert response.status_code == 200
+    assert stored_totals(user) == {ingredients[0].id: 70, ingredients[3].id: 5}
+
+
+def test_totals_follow_admin_inline_edit(
+    make_user, user, recipes, ingredients
+):
+    soup, _ = recipes
+    ShoppingCart.objects.add(user.id, [soup.id])
+    admin = make_user('admin')
+    admin.is_staff = admin.is_superuser = True
+    admin.save()
+    client = Client()
+    client.force_login(admin)
+    url = f'/admin/recipes/recipe/{soup.id}/change/'
+    context = client.get(url).context
+    form = context['adminform'].form
+    data = {
+        name: form.initial[name]
+        for name in ('author', 'name', 'text', 'cooking_time')
+    }
+    data['tags'] = [tag.id for tag in soup.tags.all()]
+    formset = context['inline_admin_formsets'][0].formset
+    prefix = formset.prefix
+    rows = list(soup.ingredient_list.order_by('id'))
+    data.update({
+        f'{prefix}-TOTAL_FORMS': len(rows) + 1,
+        f'{prefix}-INITIAL_FORMS': len(rows),
+        f'{prefix}-MIN_NUM_FORMS': 0,
+        f'{prefix}-MAX_NUM_FORMS': 1000,
+    })
+    for number, row in enumerate(rows):
+        data.update({
+            f'{prefix}-{number}-id': row.id,
+            f'{prefix}-{number}-recipe': soup.id,
+            f'{prefix}-{number}-ingredient': row.ingredient_id,
+            f'{prefix}-{number}-amount': row.amount,
+        })
+    # Change the first amount, remove the second row, add a new one.
+    data[f'{prefix}-0-amount'] = 120
+    data[f'{prefix}-1-DELETE'] = 'on'
+    data.update({
+        f'{prefix}-2-recipe': soup.id,
+        f'{prefix}-2-ingredient': ingredients[4].id,
+        f'{prefix}-2-amount': 8,
+    })
+    response = client.post(url, data)
+    assert response.status_code == 302
+    assert stored_totals(user) == {
+        ingredients[0].id: 120, ingredients[4].id: 8
+    }
+
+
+def test_recalculate_counters_rebuilds_totals(user, recipes, ingredients):
+    soup, stew = recipes
+    ShoppingCart.objects.add(user.id, [soup.id])
+    ShoppingCart.objects.add(user.id, [stew.id])
+    ShoppingCartIngredient.objects.filter(user=user).update(total=1)
+    ShoppingCartIngredient.objects.create(
+        user=user, ingredient=ingredients[5], total=3
+    )
+    recalculate_counters()
+    assert stored_totals(user) == expected_totals(user)
+
+
+def test_download_lists_stored_totals(api_client, user, recipes):
+    for recipe in recipes:
+        ShoppingCart.objects.add(user.id, [recipe.id])
+    response = api_client.get('/api/recipes/download_shopping_cart/')
+    assert response.status_code == 200
+    content = b''.join(response.streaming_content).decode()
+    assert content.splitlines() == [
+        'ingredient 0: 130 g',
+        'ingredient 1: 50 g',
+        'ingredient 2: 10 g',
+    ]
@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Tag
+
+
+def names(response):
+    assert response.status_code == 200
+    return [recipe['name'] for recipe in response.json()['results']]
+
+
+@pytest.fixture
+def recipes(author, tags, make_recipe):
+    soup = make_recipe(author, 'Soup', tag_count=3)
+    stew = make_recipe(author, 'Stew')
+    pie = make_recipe(author, 'Pie')
+    pie.tags.set([tags[2]])
+    return soup, stew, pie
+
+
+@pytest.mark.parametrize('slugs, expected', (
+    (['tag-0'], ['Stew', 'Soup']),
+    (['tag-2'], ['Pie', 'Soup']),
+    (['tag-1', 'tag-2'], ['Pie', 'Soup']),
+    (['tag-0', 'tag-1', 'tag-2'], ['Pie', 'Stew', 'Soup']),
+))
+def test_recipes_with_any_tag_are_listed_once(
+    anonymous_client, recipes, slugs, expected
+):
+    response = anonymous_client.get('/api/recipes/', {'tags': slugs})
+    assert names(response) == expected
+    assert response.json()['count'] == len(expected)
+
+
+def test_unknown_tag_is_rejected(anonymous_client, recipes):
+    response = anonymous_client.get(
+        '/api/recipes/', {'tags': ['tag-0', 'missing']}
+    )
+    assert response.status_code == 400
+    assert 'tags' in response.json()
+
+
+def test_tags_are_resolved_without_a_tag_query(anonymous_client, recipes):
+    anonymous_client.get('/api/recipes/', {'tags': ['tag-0']})
+    with CaptureQueriesContext(connection) as unfiltered:
+        names(anonymous_client.get('/api/recipes/'))
+    with CaptureQueriesContext(connection) as filtered:
+        names(anonymous_client.get(
+            '/api/recipes/', {'tags': ['tag-0', 'tag-1']}
+        ))
+    assert len(filtered) == len(unfiltered)
+    assert not any(
+        'DISTINCT' in query['sql'] for query in filtered.captured_queries
+    )
+
+
+def test_new_tag_can_be_filtered_on(
+    anonymous_client, recipes, django_capture_on_commit_callbacks
+):
+    soup, _, _ = recipes
+    anonymous_client.get('/api/recipes/', {'tags': ['tag-0']})
+    with django_capture_on_commit_callbacks(execute=True):
+        soup.tags.add(
+            Tag.objects.create(name='New', slug='new', color='#00FF00')
+        )
+    assert names(
+        anonymous_client.get('/api/recipes/', {'tags': ['new']})
+    ) == ['Soup']
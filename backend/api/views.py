@@ -1,50 +1,105 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import (
+    BooleanField, F, Prefetch, Value, Window,
+    prefetch_related_objects,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.http import (
+    FileResponse, Http404, HttpResponse, StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.permissions import (
     AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
 )
 
+from foodgram.db_router import ReplicaReadMixin, primary_reads
+from recipes.bulk import RecipeImporter, export_recipes
+from recipes.cookable_index import cookable_index
+from recipes.ingredient_index import ingredient_index
 from recipes.models import (
     Favorite,
     Ingredient,
-    IngredientRecipe,
     Recipe,
     ShoppingCart,
+    ShoppingCartIngredient,
     Tag,
 )
+from recipes.recommendations import get_recommended_ids
 from users.models import Subscribe, User
+from .caching import (
+    AnonymousRequest, CachedResponseMixin, get_cached_recipe,
+    overlay_user_flags,
+)
 from .filters import IngredientFilter, RecipeFilter
-from .pagination import CustomPagination
+from .pagination import CustomPagination, KeysetPaginationMixin
 from .permissions import IsAuthor
+from .renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
 from .serializer import (
+    CookableQuerySerializer,
     FavoriteSerializer,
     IngredientSerializer,
     RecipeCreateSerializer,
+    RecipeIdsSerializer,
     RecipesSerializer,
     TagSerializer,
     ShoppingCartSerializer,
+    ShowFavoriteSerializer,
     SubscribeSerializer,
     UserSerializer,
 )
+from .shopping_list import generate_csv, generate_pdf, generate_text
 
+SHOPPING_LIST_CHUNK_SIZE = 2000
 
-class CustomUserViewSet(UserViewSet):
+
+class CustomUserViewSet(
+    ReplicaReadMixin, KeysetPaginationMixin, UserViewSet
+):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (AllowAny,)
     pagination_class = CustomPagination
+    keyset_ordering = ('username',)
+    replica_actions = ('subscriptions',)
+
+    @staticmethod
+    def get_recipes_window(authors, limit):
+        """Fetch the first ``limit`` recipes of every author in one query."""
+        recipes = Recipe.objects.filter(author__in=authors)
+        if limit is None:
+            return recipes.order_by('id')
+        windowed = recipes.annotate(recipe_position=Window(
+            expression=RowNumber(),
+            partition_by=F('author_id'),
+            order_by=F('id').asc(),
+        )).values('id', 'recipe_position')
+        sql, params = windowed.query.sql_with_params()
+        return Recipe.objects.filter(id__in=RawSQL(
+            f'SELECT "id" FROM ({sql}) AS "windowed" '
+            f'WHERE "recipe_position" <= %s',
+            (*params, limit),
+        )).order_by('id')
 
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        queryset = User.objects.filter(following__user=user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        )
         pages = self.paginate_queryset(queryset)
+        limit = request.query_params.get('recipes_limit')
+        limit = int(limit) if limit and limit.isdigit() else None
+        prefetch_related_objects(pages, Prefetch(
+            'recipes',
+            queryset=self.get_recipes_window(pages, limit),
+            to_attr='recipes_window',
+        ))
         serializer = SubscribeSerializer(
             pages,
             many=True,
@@ -85,14 +140,20 @@ class CustomUserViewSet(UserViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(
+    ReplicaReadMixin, CachedResponseMixin, viewsets.ModelViewSet
+):
+    cache_namespace = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ReplicaReadMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet
+):
+    cache_namespace = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
@@ -100,76 +161,293 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend, filters.SearchFilter,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            self.search, request, *args, **kwargs
+        )
+
+    def search(self, request, *args, **kwargs):
+        limit = request.query_params.get('limit')
+        return Response(ingredient_index.search(
+            request.query_params.get('name', ''),
+            int(limit) if limit and limit.isdigit() else None,
+        ))
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(
+    ReplicaReadMixin, KeysetPaginationMixin, viewsets.ModelViewSet
+):
     queryset = Recipe.objects.all()
     serializer_class = RecipeCreateSerializer
     permission_classes = (IsAuthor,)
     pagination_class = CustomPagination
+    keyset_ordering = ('-pub_date', '-id')
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        queryset = Recipe.objects.with_related().order_by(
+            *self.keyset_ordering
+        )
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.with_user_flags(user)
+        return queryset
+
+    @staticmethod
+    def render_recipe(request, pk, renderer, media_type):
+        """Render the recipe as an anonymous user sees it.
+
+        The rendering is cached under the generation bumped by the last
+        write, so it is read from primary: a lagging replica could store
+        the old recipe under the new generation.
+        """
+        with primary_reads():
+            recipe = get_object_or_404(
+                Recipe.objects.using('default').with_related(), pk=pk
+            )
+            data = RecipesSerializer(
+                recipe, context={'request': AnonymousRequest(request)}
+            ).data
+        content_type = media_type
+        if renderer.charset:
+            content_type = f'{media_type}; charset={renderer.charset}'
+        return content_type, renderer.render(data, media_type, {})
+
+    @staticmethod
+    def get_user_flags(user, pk):
+        flags = dict.fromkeys(
+            ('is_favorited', 'is_in_shopping_cart', 'is_subscribed'), False
+        )
+        if user.is_authenticated:
+            found = Recipe.objects.filter(pk=pk).with_user_flags(
+                user
+            ).values_list(
+                'is_favorited', 'is_in_shopping_cart', 'author_is_subscribed'
+            ).first()
+            if found is None:
+                raise Http404
+            flags.update(zip(flags, found))
+        return flags
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            pk = int(self.kwargs['pk'])
+        except ValueError:
+            raise Http404
+        content_type, content, offsets = get_cached_recipe(
+            pk,
+            request.accepted_media_type,
+            lambda: self.render_recipe(
+                request,
+                pk,
+                request.accepted_renderer,
+                request.accepted_media_type,
+            ),
+        )
+        return HttpResponse(
+            overlay_user_flags(
+                content,
+                offsets,
+                self.get_user_flags(request.user, pk),
+            ),
+            content_type=content_type,
+        )
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipesSerializer
         return RecipeCreateSerializer
 
-    @staticmethod
-    def generate_shopping_list(ingredients):
-        shopping_list = []
-        for ingredient in ingredients:
-            shopping_line = (
-                f"{ingredient['ingredient__name']}: "
-                f"{ingredient['total']} "
-                f"{ingredient['ingredient__measurement_unit']}\n"
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, PDFRenderer),
+    )
+    def download_shopping_cart(self, request):
+        ingredients = ShoppingCartIngredient.objects.filter(
+            user=request.user
+        ).order_by('ingredient__name').values(
+            'ingredient__name', 'ingredient__measurement_unit', 'total'
+        ).iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+        export_format = request.accepted_renderer.format
+        if export_format == 'pdf':
+            response = FileResponse(
+                generate_pdf(ingredients),
+                content_type='application/pdf',
+            )
+        elif export_format == 'csv':
+            response = StreamingHttpResponse(
+                generate_csv(ingredients),
+                content_type='text/csv; charset=utf-8',
             )
-            shopping_list.append(shopping_line)
-        return "".join(shopping_list)
+        else:
+            response = StreamingHttpResponse(
+                generate_text(ingredients),
+                content_type='text/plain; charset=utf-8',
+            )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{export_format}"'
+        )
+        return response
 
     @action(detail=False, methods=['GET'])
-    def download_shopping_cart(self, request):
-        ingredients = IngredientRecipe.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).order_by('ingredient__name').values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(total=Sum('amount'))
-        shopping_list = self.generate_shopping_list(ingredients)
-        response = HttpResponse(
-            shopping_list, content_type="text/plain; charset=utf-8"
+    def recommended(self, request):
+        """Recipes similar to the user's favorites and cart.
+
+        Users with nothing to go on yet, and anonymous users, get the most
+        favorited recipes instead.
+        """
+        paginator = CustomPagination()
+        ranked = None
+        if request.user.is_authenticated:
+            ranked = get_recommended_ids(request.user)
+        if ranked:
+            page_ids = paginator.paginate_queryset(ranked, request, self)
+            recipes = self.get_queryset().in_bulk(page_ids)
+            page = [recipes[pk] for pk in page_ids if pk in recipes]
+        else:
+            page = paginator.paginate_queryset(
+                self.get_queryset().order_by('-favorites_count', '-id'),
+                request,
+                self,
+            )
+        serializer = RecipesSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['GET'])
+    def cookable(self, request):
+        """Recipes ranked by the share of their ingredients the user has."""
+        query = CookableQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        paginator = CustomPagination()
+        matches = paginator.paginate_queryset(
+            cookable_index.match(
+                query.validated_data['ingredients'],
+                query.validated_data['min_coverage'],
+            ),
+            request,
+            self,
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in matches]
+        )
+        matches = [match for match in matches if match[0] in recipes]
+        data = RecipesSerializer(
+            [recipes[recipe_id] for recipe_id, _, _ in matches],
+            many=True,
+            context=self.get_serializer_context(),
+        ).data
+        for item, (_, matched, total) in zip(data, matches):
+            item['coverage'] = round(matched / total, 3)
+            item['missing_ingredients'] = total - matched
+        return paginator.get_paginated_response(data)
+
+    @action(
+        detail=False,
+        methods=['POST'],
+        url_path='import',
+        permission_classes=(IsAuthenticated,),
+    )
+    def import_recipes(self, request):
+        """Create recipes of the user from an NDJSON request body."""
+        importer = RecipeImporter(author=request.user)
+        for _ in importer.run(request.stream or ()):
+            pass
+        if importer.created:
+            response_status = status.HTTP_201_CREATED
+        elif importer.errors:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_200_OK
+        return Response({
+            'created': importer.created,
+            'skipped': importer.skipped,
+            'errors': importer.errors,
+        }, status=response_status)
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=(IsAuthenticated,),
+    )
+    def export(self, request):
+        response = StreamingHttpResponse(
+            export_recipes(self.filter_queryset(Recipe.objects.all())),
+            content_type='application/x-ndjson; charset=utf-8',
         )
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
+            'attachment; filename="recipes.ndjson"'
         )
         return response
 
     def handle_favorite_or_shoping_cart(
         self, request, pk, serializer_class, model_class
     ):
-        data = {
-            'user': request.user.id,
-            'recipe': pk
-        }
         recipe = self.get_object()
-        serializer = serializer_class(data=data, context={'request': request})
-
         if request.method == 'POST':
-            if serializer.is_valid():
-                serializer.save()
+            # The manager checks for an existing row under the user lock.
+            if not model_class.objects.add(request.user.id, [recipe.id]):
                 return Response(
-                    serializer.data,
-                    status=status.HTTP_201_CREATED
+                    {api_settings.NON_FIELD_ERRORS_KEY: [
+                        serializer_class.already_added_message
+                    ]},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
             return Response(
-                serializer.errors,
-                status=status.HTTP_400_BAD_REQUEST
+                ShowFavoriteSerializer(
+                    recipe, context={'request': request}
+                ).data,
+                status=status.HTTP_201_CREATED
             )
-        get_object_or_404(
-            model_class,
-            user=request.user.id,
-            recipe=recipe
-        ).delete()
+        if not model_class.objects.remove(request.user.id, [recipe.id]):
+            raise Http404
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def handle_favorite_or_shoping_cart_batch(self, request, model_class):
+        """Add or remove a list of recipes with one INSERT or DELETE."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.validated_data['recipes']
+        recipe_ids = [recipe.id for recipe in recipes]
+        if request.method == 'DELETE':
+            model_class.objects.remove(request.user.id, recipe_ids)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        model_class.objects.add(request.user.id, recipe_ids)
+        return Response(
+            ShowFavoriteSerializer(
+                recipes, many=True, context={'request': request}
+            ).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+        permission_classes=[IsAuthenticated])
+    def shopping_cart_batch(self, request):
+        return self.handle_favorite_or_shoping_cart_batch(
+            request, ShoppingCart
+        )
+
+    @action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        url_path='favorite',
+        url_name='favorite-batch',
+        permission_classes=[IsAuthenticated])
+    def favorite_batch(self, request):
+        return self.handle_favorite_or_shoping_cart_batch(
+            request, Favorite
+        )
+
     @action(
         detail=True,
         methods=('POST', 'DELETE'),
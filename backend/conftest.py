@@ -0,0 +1,93 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from recipes.cookable_index import cookable_index
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from recipes.tag_index import tag_index
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(settings, tmp_path):
+    """Drop the caches and in-memory indexes a previous test filled."""
+    settings.MEDIA_ROOT = tmp_path
+    cache.clear()
+    for index in (ingredient_index, tag_index, cookable_index):
+        index.invalidate()
+
+
+@pytest.fixture
+def make_user(db):
+    def make_user(username):
+        return User.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password='password',
+            first_name=username,
+            last_name=username,
+        )
+    return make_user
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user('user')
+
+
+@pytest.fixture
+def author(make_user):
+    return make_user('author')
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=f'Tag {i}', slug=f'tag-{i}', color='#FF0000')
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(
+            name=f'ingredient {i}', measurement_unit='g'
+        )
+        for i in range(6)
+    ]
+
+
+@pytest.fixture
+def make_recipe(tags, ingredients):
+    """Create a recipe with ``amounts`` (ingredient index -> amount)."""
+    def make_recipe(author, name, amounts=None, tag_count=1):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=name,
+            image='static/recipe/test.png',
+            text=name,
+            cooking_time=10,
+        )
+        recipe.tags.set(tags[:tag_count])
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe, ingredient=ingredients[index], amount=amount
+            )
+            for index, amount in (amounts or {0: 100}).items()
+        )
+        return recipe
+    return make_recipe
@@ -0,0 +1,135 @@
+import asyncio
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+
+class RequestState:
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+_state = ContextVar('database_request_state', default=None)
+
+
+@contextmanager
+def replica_reads():
+    """Route the reads of the block to a replica unless pinned to primary."""
+    state = _state.get()
+    if state is None or state.pinned or not settings.REPLICA_DATABASES:
+        yield
+        return
+    state.replica = random.choice(settings.REPLICA_DATABASES)
+    try:
+        yield
+    finally:
+        state.replica = None
+
+
+@contextmanager
+def primary_reads():
+    """Route the reads of the block to primary, even inside replica_reads()."""
+    state = _state.get()
+    if state is None or state.replica is None:
+        yield
+        return
+    replica, state.replica = state.replica, None
+    try:
+        yield
+    finally:
+        state.replica = replica
+
+
+class ReplicaRouter:
+    """Send reads to the replica chosen for the request, writes to primary.
+
+    Outside of replica_reads() every query goes to ``default``, so
+    management commands, admin and all writes are unaffected.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is not None and state.replica:
+            return state.replica
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+class ReadYourWritesMiddleware(MiddlewareMixin):
+    """Pin the client's reads to primary for a while after it wrote.
+
+    Replicas lag behind the primary, so a client that has just written
+    gets a short-lived cookie and keeps reading from primary until the
+    cookie expires.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        state = RequestState(
+            settings.READ_YOUR_WRITES_COOKIE in request.COOKIES
+        )
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin_if_wrote(state, response)
+
+    async def __acall__(self, request):
+        state = RequestState(
+            settings.READ_YOUR_WRITES_COOKIE in request.COOKIES
+        )
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin_if_wrote(state, response)
+
+    def pin_if_wrote(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                settings.READ_YOUR_WRITES_COOKIE,
+                '1',
+                max_age=settings.READ_YOUR_WRITES_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class ReplicaReadMixin:
+    """Serve safe-method requests of the viewset from a replica.
+
+    ``replica_actions`` limits replica reads to the listed actions.
+    """
+
+    replica_actions = None
+
+    def dispatch(self, request, *args, **kwargs):
+        action = self.action_map.get(request.method.lower())
+        if request.method in SAFE_METHODS and (
+            self.replica_actions is None or action in self.replica_actions
+        ):
+            with replica_reads():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Process-local request metrics rendered in Prometheus text format.
+
+    Every worker process keeps its own registry, so each scrape reports
+    the worker that served it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.db_time = Counter()
+        self.response_bytes = Counter()
+        self.n_plus_one = Counter()
+
+    def record(self, view, method, status, duration, queries, db_time,
+               size, n_plus_one):
+        with self.lock:
+            self.requests[(view, method, status)] += 1
+            self.latency[(view, method)].observe(duration)
+            self.queries[(view, method)].observe(queries)
+            self.db_time[(view, method)] += db_time
+            self.response_bytes[(view, method)] += size
+            if n_plus_one:
+                self.n_plus_one[(view, method)] += 1
+
+    @staticmethod
+    def labels(names, values):
+        return ','.join(
+            f'{name}="{value}"' for name, value in zip(names, values)
+        )
+
+    def render_histogram(self, name, histograms):
+        lines = [f'# TYPE {name} histogram']
+        for key, histogram in sorted(histograms.items()):
+            labels = self.labels(('view', 'method'), key)
+            total = 0
+            for bound, count in zip(
+                (*histogram.buckets, '+Inf'), histogram.counts
+            ):
+                total += count
+                lines.append(
+                    f'{name}_bucket{{{labels},le="{bound}"}} {total}'
+                )
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'{name}_count{{{labels}}} {total}')
+        return lines
+
+    def render_counter(self, name, counter, names=('view', 'method')):
+        lines = [f'# TYPE {name} counter']
+        for key, value in sorted(counter.items()):
+            lines.append(f'{name}{{{self.labels(names, key)}}} {value}')
+        return lines
+
+    def render(self):
+        with self.lock:
+            lines = [
+                *self.render_counter(
+                    'http_requests_total',
+                    self.requests,
+                    ('view', 'method', 'status'),
+                ),
+                *self.render_histogram(
+                    'http_request_duration_seconds', self.latency
+                ),
+                *self.render_histogram('db_queries_per_request', self.queries),
+                *self.render_counter(
+                    'db_query_duration_seconds_total', self.db_time
+                ),
+                *self.render_counter(
+                    'http_response_size_bytes_total', self.response_bytes
+                ),
+                *self.render_counter(
+                    'n_plus_one_requests_total', self.n_plus_one
+                ),
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    """``execute_wrapper`` callback timing queries and counting templates."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.templates = Counter()
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self.lock:
+                self.duration += time.perf_counter() - started
+                self.templates[sql] += 1
+
+
+_recorder = ContextVar('query_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Pass the query to the recorder of the current request, if any.
+
+    The recorder lives in a context variable, so queries that async views
+    run in worker threads are attributed to their request as well.
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(
+    lambda sender, connection, **kwargs: install_query_recorder(connection),
+    weak=False,
+)
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """Record latency, SQL activity and response size per resolved view."""
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        for alias in connections:
+            install_query_recorder(connections[alias])
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self.record(request, response, recorder, started)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self.record(request, response, recorder, started)
+        return response
+
+    def record(self, request, response, recorder, started):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        repeated = [
+            (sql, count) for sql, count in recorder.templates.items()
+            if count > settings.METRICS_N_PLUS_ONE_THRESHOLD
+        ]
+        size = 0 if response.streaming else len(response.content)
+        queries = sum(recorder.templates.values())
+        registry.record(
+            view, request.method, response.status_code, duration,
+            queries, recorder.duration, size, bool(repeated),
+        )
+        for sql, count in repeated:
+            logger.warning(
+                'Possible N+1 in %s %s: query repeated %d times: %s',
+                request.method, view, count, sql,
+            )
+        if settings.METRICS_LOG_REQUESTS:
+            logger.info(
+                '%s %s %s %.1fms queries=%d db=%.1fms bytes=%d',
+                request.method, view, response.status_code,
+                duration * 1000, queries, recorder.duration * 1000, size,
+            )
+
+
+def metrics_view(request):
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
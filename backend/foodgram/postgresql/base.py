@@ -0,0 +1,153 @@
+import threading
+
+import psycopg2
+import psycopg2.extras
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from psycopg2 import pool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 pool that waits for a free connection.
+
+    ThreadedConnectionPool raises as soon as it is exhausted; the
+    semaphore makes threads (or greenlets, once gevent has patched
+    threading) wait up to ``timeout`` seconds instead.
+    """
+
+    def __init__(self, size, timeout, **conn_params):
+        # psycopg2 closes returned connections beyond minconn, so the
+        # pool keeps all of them open.
+        self.pool = pool.ThreadedConnectionPool(size, size, **conn_params)
+        self.slots = threading.BoundedSemaphore(size)
+        self.timeout = timeout
+
+    def getconn(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise psycopg2.OperationalError(
+                'Timed out waiting for a pooled database connection'
+            )
+        try:
+            return self.pool.getconn()
+        except Exception:
+            self.slots.release()
+            raise
+
+    def putconn(self, connection, close=False):
+        try:
+            self.pool.putconn(connection, close=close)
+        finally:
+            self.slots.release()
+
+
+def close_pools():
+    """Close every pooled connection of this process."""
+    with _pools_lock:
+        while _pools:
+            _pools.popitem()[1].pool.closeall()
+
+
+def is_alive(connection):
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+    except psycopg2.Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend with connection health checks and pooling.
+
+    Extra DATABASES keys:
+
+    * ``CONN_HEALTH_CHECKS`` - check a persistent connection with
+      ``SELECT 1`` before its first use in each request, or a pooled one
+      when it is borrowed, and reconnect if the server dropped it.
+    * ``POOL_SIZE`` - when set, borrow connections from a process-wide
+      pool of this size instead of opening them; use with
+      ``CONN_MAX_AGE = 0`` so they are returned after every request.
+    * ``POOL_TIMEOUT`` - seconds to wait for a free pooled connection.
+    """
+
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def get_pool(self):
+        with _pools_lock:
+            if self.alias not in _pools:
+                _pools[self.alias] = ConnectionPool(
+                    self.settings_dict['POOL_SIZE'],
+                    self.settings_dict.get('POOL_TIMEOUT', 10),
+                    **self.get_connection_params(),
+                )
+            return _pools[self.alias]
+
+    def get_new_connection(self, conn_params):
+        if not self.settings_dict.get('POOL_SIZE'):
+            return super().get_new_connection(conn_params)
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured(
+                'POOL_SIZE requires CONN_MAX_AGE = 0.'
+            )
+        connection_pool = self.get_pool()
+        connection = connection_pool.getconn()
+        if connection.closed or (
+            self.health_check_enabled and not is_alive(connection)
+        ):
+            connection_pool.putconn(connection, close=True)
+            connection = connection_pool.getconn()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        if self.connection is None or not self.settings_dict.get(
+            'POOL_SIZE'
+        ):
+            return super()._close()
+        broken = self.connection.closed or (
+            self.errors_occurred and not self.is_usable()
+        )
+        with self.wrap_database_errors:
+            self.get_pool().putconn(self.connection, close=broken)
+
+    def close_if_unusable_or_obsolete(self):
+        self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+        ):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
@@ -0,0 +1,23 @@
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+# SQLite settings for the test suite and the benchmark commands, which
+# create their own throwaway test database.
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    # A second SQLite file standing in for a read replica. It is only
+    # read from when a test lists it in REPLICA_DATABASES.
+    'replica1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+    },
+}
+REPLICA_DATABASES = []
+MEDIA_ROOT = tempfile.mkdtemp()
+IMAGE_PROCESSING_WORKERS = 0
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
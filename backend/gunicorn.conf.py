@@ -0,0 +1,25 @@
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1
+))
+# The Dockerfile serves foodgram.<interface>:application. Under asgi the
+# async views run on uvicorn workers; under wsgi more than one thread
+# switches the default worker class to gthread.
+interface = os.getenv('GUNICORN_INTERFACE', 'wsgi')
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+if interface == 'asgi':
+    default_worker_class = 'uvicorn.workers.UvicornWorker'
+elif threads > 1:
+    default_worker_class = 'gthread'
+else:
+    default_worker_class = 'sync'
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', default_worker_class)
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 2))
+# Recycle workers now and then to bound memory growth.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
@@ -1,11 +1,19 @@
+from collections import defaultdict
+
 from django.contrib import admin
 
 from .models import (
     Recipe, IngredientRecipe, Ingredient,
-    Tag, Favorite, ShoppingCart
+    Tag, Favorite, ShoppingCart, ShoppingCartIngredient
 )
 
 
+def ingredient_amounts(recipe):
+    return dict(
+        recipe.ingredient_list.values_list('ingredient_id', 'amount')
+    )
+
+
 class IngredientInline(admin.StackedInline):
     model = IngredientRecipe
 
@@ -15,6 +23,8 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'author',
         'name',
+        'favorites_count',
+        'in_carts_count',
     )
     inlines = [IngredientInline]
     list_editable = ('name',)
@@ -22,6 +32,24 @@ class RecipeAdmin(admin.ModelAdmin):
     search_fields = ('author', 'name',)
     empty_value_display = '-empty-'
 
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not IngredientRecipe or not change:
+            return super().save_formset(request, form, formset, change)
+        # The inline writes the rows itself, so the cart totals of the
+        # users holding the recipe get the differences applied here.
+        recipe = form.instance
+        old = ingredient_amounts(recipe)
+        super().save_formset(request, form, formset, change)
+        new = ingredient_amounts(recipe)
+        ShoppingCartIngredient.objects.apply_deltas(
+            recipe.shopping_cart.values_list('user_id', flat=True),
+            {
+                ingredient_id: new.get(ingredient_id, 0)
+                - old.get(ingredient_id, 0)
+                for ingredient_id in old.keys() | new.keys()
+            },
+        )
+
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
@@ -46,8 +74,14 @@ class TagAdmin(admin.ModelAdmin):
     search_fields = ('name', 'slug')
 
 
-@admin.register(Favorite)
-class Favorite(admin.ModelAdmin):
+class FavoriteAndShopAdmin(admin.ModelAdmin):
+    """Keep the recipe counters and cart totals in step with admin edits.
+
+    The models send no per-row signals, so additions and deletions are
+    counted through the model manager. Existing rows cannot be moved to
+    another user or recipe; delete and add them instead.
+    """
+
     list_display = (
         'user',
         'recipe',
@@ -55,12 +89,32 @@ class Favorite(admin.ModelAdmin):
     list_filter = ('recipe',)
     search_fields = ('recipe',)
 
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            return ('user', 'recipe')
+        return super().get_readonly_fields(request, obj)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            self.model.objects.count(obj.user_id, [obj.recipe_id])
+
+    def delete_model(self, request, obj):
+        self.model.objects.remove(obj.user_id, [obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = defaultdict(list)
+        for user_id, recipe_id in queryset.values_list('user_id', 'recipe_id'):
+            recipe_ids[user_id].append(recipe_id)
+        for user_id, user_recipe_ids in recipe_ids.items():
+            self.model.objects.remove(user_id, user_recipe_ids)
+
+
+@admin.register(Favorite)
+class Favorite(FavoriteAndShopAdmin):
+    pass
+
 
 @admin.register(ShoppingCart)
-class ShoppingCart(admin.ModelAdmin):
-    list_display = (
-        'user',
-        'recipe',
-    )
-    list_filter = ('recipe',)
-    search_fields = ('recipe',)
+class ShoppingCart(FavoriteAndShopAdmin):
+    pass
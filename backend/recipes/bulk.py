@@ -0,0 +1,300 @@
+import base64
+import binascii
+import io
+import json
+import uuid
+from collections import Counter
+from itertools import islice
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Prefetch
+from PIL import Image
+
+from users.models import User
+from .cookable_index import cookable_index
+from .counters import add_to
+from .images import schedule_variants
+from .models import MAX_LEN_MED, Ingredient, IngredientRecipe, Recipe, Tag
+
+MAX_SMALL_INT = 32767
+MAX_REPORTED_ERRORS = 100
+IMAGE_DIR = Recipe._meta.get_field('image').upload_to
+IMAGE_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif'}
+
+
+class RecordError(ValueError):
+    pass
+
+
+def positive_int(value, field):
+    if (
+        isinstance(value, bool) or not isinstance(value, int)
+        or not 1 <= value <= MAX_SMALL_INT
+    ):
+        raise RecordError(f'{field} must be an integer from 1 to 32767')
+    return value
+
+
+def text(record, field, max_length=None):
+    value = record.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise RecordError(f'{field} is required')
+    if max_length and len(value) > max_length:
+        raise RecordError(f'{field} is longer than {max_length} characters')
+    return value
+
+
+def store_image(value, allow_paths=False):
+    """Save a base64 data URI as an image file.
+
+    The content must decode to a JPEG, PNG or GIF image and the file
+    extension follows the detected format, not the URI header. With
+    ``allow_paths`` the value may instead name an existing file in the
+    recipe image directory.
+    """
+    if not isinstance(value, str) or not value:
+        raise RecordError('image is required')
+    if not value.startswith('data:image/'):
+        if not allow_paths:
+            raise RecordError('image must be a base64 data URI')
+        if (
+            not value.startswith(IMAGE_DIR) or '..' in value
+            or not default_storage.exists(value)
+        ):
+            raise RecordError(f'image {value} does not exist')
+        return value
+    _, _, encoded = value.partition(';base64,')
+    try:
+        content = base64.b64decode(encoded, validate=True)
+    except binascii.Error:
+        raise RecordError('image is not valid base64')
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image.verify()
+            image_format = image.format
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        raise RecordError('image is not a valid image')
+    if image_format not in IMAGE_EXTENSIONS:
+        raise RecordError('image must be a JPEG, PNG or GIF')
+    return default_storage.save(
+        f'{IMAGE_DIR}{uuid.uuid4()}.{IMAGE_EXTENSIONS[image_format]}',
+        ContentFile(content),
+    )
+
+
+class RecipeImporter:
+    """Create recipes from NDJSON records in batched transactions.
+
+    Every batch resolves its tags, ingredients, authors and already used
+    recipe names with one query each and inserts recipes, tag links and
+    ingredient rows with one bulk INSERT each. Invalid records and names
+    that already exist are reported and skipped; they never abort a batch.
+    Images are read from data URIs; paths to already stored files are
+    only accepted with ``image_paths``, which the API never sets so that
+    a user cannot reuse the upload of another one.
+    """
+
+    def __init__(self, author=None, batch_size=500, image_variants=True,
+                 image_paths=False):
+        self.author = author
+        self.batch_size = batch_size
+        self.image_variants = image_variants
+        self.image_paths = image_paths
+        self.created = self.skipped = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def parse(self, numbered_lines):
+        records = []
+        for line, raw in numbered_lines:
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                self.error(line, 'invalid JSON')
+                continue
+            if not isinstance(record, dict):
+                self.error(line, 'a JSON object is expected')
+                continue
+            records.append((line, record))
+        return records
+
+    def load_references(self, records):
+        slugs, ingredient_names, usernames, names = set(), set(), set(), set()
+        for _, record in records:
+            for slug in record.get('tags') or ():
+                if isinstance(slug, str):
+                    slugs.add(slug)
+            for ingredient in record.get('ingredients') or ():
+                if isinstance(ingredient, dict):
+                    ingredient_names.add(ingredient.get('name'))
+            if isinstance(record.get('author'), str):
+                usernames.add(record['author'])
+            if isinstance(record.get('name'), str):
+                names.add(record['name'])
+        self.tags = dict(
+            Tag.objects.filter(slug__in=slugs).values_list('slug', 'id')
+        )
+        self.ingredients = {
+            (name, unit): pk
+            for pk, name, unit in Ingredient.objects.filter(
+                name__in=ingredient_names - {None}
+            ).values_list('id', 'name', 'measurement_unit')
+        }
+        self.authors = {} if self.author else dict(
+            User.objects.filter(username__in=usernames).values_list(
+                'username', 'id'
+            )
+        )
+        self.used_names = set(
+            Recipe.objects.filter(name__in=names).values_list(
+                'name', flat=True
+            )
+        )
+
+    def build(self, record):
+        name = text(record, 'name', MAX_LEN_MED)
+        if name in self.used_names:
+            raise RecordError(f'recipe {name} already exists')
+        if self.author:
+            author_id = self.author.id
+        else:
+            author_id = self.authors.get(record.get('author'))
+            if author_id is None:
+                raise RecordError(f'unknown author {record.get("author")}')
+        tags = record.get('tags')
+        if not isinstance(tags, list) or not tags:
+            raise RecordError('tags must be a non-empty list of slugs')
+        tag_ids = []
+        for slug in tags:
+            if slug not in self.tags:
+                raise RecordError(f'unknown tag {slug}')
+            tag_ids.append(self.tags[slug])
+        ingredients = record.get('ingredients')
+        if not isinstance(ingredients, list) or not ingredients:
+            raise RecordError('ingredients must be a non-empty list')
+        amounts = {}
+        for ingredient in ingredients:
+            if not isinstance(ingredient, dict):
+                raise RecordError('ingredients must be objects')
+            key = (ingredient.get('name'), ingredient.get('measurement_unit'))
+            if key not in self.ingredients:
+                raise RecordError(f'unknown ingredient {key[0]} ({key[1]})')
+            pk = self.ingredients[key]
+            if pk in amounts:
+                raise RecordError('ingredients must be unique')
+            amounts[pk] = positive_int(ingredient.get('amount'), 'amount')
+        recipe = Recipe(
+            author_id=author_id,
+            name=name,
+            text=text(record, 'text'),
+            cooking_time=positive_int(
+                record.get('cooking_time'), 'cooking_time'
+            ),
+        )
+        recipe.image = store_image(record.get('image'), self.image_paths)
+        return recipe, set(tag_ids), amounts
+
+    @transaction.atomic
+    def import_batch(self, numbered_lines):
+        first_error = len(self.errors)
+        records = self.parse(numbered_lines)
+        self.load_references(records)
+        new = []
+        for line, record in records:
+            try:
+                recipe, tag_ids, amounts = self.build(record)
+            except RecordError as error:
+                self.error(line, str(error))
+                continue
+            self.used_names.add(recipe.name)
+            new.append((recipe, tag_ids, amounts))
+        self.errors[first_error:] = sorted(
+            self.errors[first_error:], key=lambda error: error['line']
+        )
+        if not new:
+            return
+        recipes = Recipe.objects.bulk_create(
+            [recipe for recipe, _, _ in new]
+        )
+        if recipes[0].pk is None:
+            # Backends without RETURNING; names are unique in the batch.
+            ids = dict(Recipe.objects.filter(
+                name__in=[recipe.name for recipe in recipes]
+            ).values_list('name', 'id'))
+            for recipe in recipes:
+                recipe.pk = ids[recipe.name]
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+            for recipe, tag_ids, _ in new for tag_id in tag_ids
+        ])
+        IngredientRecipe.objects.bulk_create([
+            IngredientRecipe(
+                recipe_id=recipe.pk, ingredient_id=pk, amount=amount
+            )
+            for recipe, _, amounts in new for pk, amount in amounts.items()
+        ])
+        # bulk_create skips save() and the model signals.
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes]
+        ).update_search_vector()
+        add_to(User, 'recipes_count', Counter(
+            recipe.author_id for recipe in recipes
+        ))
+        cookable_index.refresh_on_commit(recipe.pk for recipe in recipes)
+        if self.image_variants:
+            for recipe in recipes:
+                schedule_variants(recipe)
+        self.created += len(recipes)
+
+    def run(self, lines):
+        """Import an iterable of NDJSON lines, yielding after each batch."""
+        numbered = enumerate(lines, 1)
+        while True:
+            batch = list(islice(numbered, self.batch_size))
+            if not batch:
+                return
+            self.import_batch(batch)
+            yield
+
+
+def export_recipes(queryset, chunk_size=500):
+    """Yield NDJSON lines in the format RecipeImporter reads."""
+    queryset = queryset.select_related('author').prefetch_related(
+        'tags',
+        Prefetch(
+            'ingredient_list',
+            queryset=IngredientRecipe.objects.select_related('ingredient'),
+        ),
+    ).order_by('id')
+    last_id = 0
+    while True:
+        # Prefetching is ignored by iterator(), so page by primary key.
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        for recipe in chunk:
+            yield json.dumps({
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'author': recipe.author.username,
+                'image': recipe.image.name,
+                'tags': [tag.slug for tag in recipe.tags.all()],
+                'ingredients': [
+                    {
+                        'name': row.ingredient.name,
+                        'measurement_unit': row.ingredient.measurement_unit,
+                        'amount': row.amount,
+                    }
+                    for row in recipe.ingredient_list.all()
+                ],
+            }, ensure_ascii=False) + '\n'
+        last_id = chunk[-1].id
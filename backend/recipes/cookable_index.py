@@ -0,0 +1,183 @@
+import heapq
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import IngredientRecipe
+
+logger = logging.getLogger(__name__)
+
+MAX_MATCHES = 1000
+BUILD_CHUNK_SIZE = 10000
+
+
+class CookableIndex:
+    """Inverted index from ingredients to the recipes that use them.
+
+    Every ingredient maps to a sorted array of recipe ids, so matching a
+    set of ingredients counts the hits of every recipe over a handful of
+    arrays instead of grouping IngredientRecipe rows in SQL. Like the
+    other in-memory indexes it is built lazily and rebuilt after
+    COOKABLE_INDEX_TTL seconds, in a background thread that swaps the new
+    index in while requests keep matching on the old one. In between,
+    saved and deleted recipes of this process are patched in after commit.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.postings = None
+        self.ingredients = None
+        self.built_at = 0
+        # Recipes refreshed while a build reads, None outside of builds.
+        self.pending = None
+        self.stale = False
+
+    def invalidate(self):
+        with self.lock:
+            self.postings = None
+            self.stale = True
+
+    def build(self):
+        with self.build_lock:
+            self.rebuild()
+
+    def rebuild(self):
+        """Read a new index without the lock and swap it in.
+
+        Matches keep using the current index meanwhile. Recipes refreshed
+        during the read are refreshed again in the new index, and an
+        invalidate() during the read discards it. The caller holds
+        build_lock.
+        """
+        with self.lock:
+            self.pending = set()
+            self.stale = False
+        postings = defaultdict(list)
+        ingredients = defaultdict(lambda: array('i'))
+        try:
+            for recipe_id, ingredient_id in IngredientRecipe.objects.order_by(
+                'recipe_id'
+            ).values_list('recipe_id', 'ingredient_id').iterator(
+                chunk_size=BUILD_CHUNK_SIZE
+            ):
+                postings[ingredient_id].append(recipe_id)
+                ingredients[recipe_id].append(ingredient_id)
+            postings = {
+                ingredient_id: array('i', recipe_ids)
+                for ingredient_id, recipe_ids in postings.items()
+            }
+            ingredients = dict(ingredients)
+        finally:
+            with self.lock:
+                pending, self.pending = self.pending, None
+        with self.lock:
+            if self.stale:
+                return
+            self.postings = postings
+            self.ingredients = ingredients
+            self.built_at = time.monotonic()
+        if pending:
+            self.refresh(pending)
+
+    def rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception('Rebuilding the cookable index failed')
+        finally:
+            self.build_lock.release()
+            connections.close_all()
+
+    def ensure_index(self):
+        """Build a missing index, start a rebuild of an expired one."""
+        if self.postings is None:
+            with self.build_lock:
+                if self.postings is None:
+                    self.rebuild()
+            return
+        expired = (
+            time.monotonic() - self.built_at > settings.COOKABLE_INDEX_TTL
+        )
+        if expired and self.build_lock.acquire(blocking=False):
+            threading.Thread(
+                target=self.rebuild_in_background,
+                name='cookable-index',
+                daemon=True,
+            ).start()
+
+    def refresh(self, recipe_ids):
+        """Re-read the ingredients of the recipes into a built index."""
+        with self.lock:
+            if self.pending is not None:
+                self.pending.update(recipe_ids)
+            if self.postings is None:
+                return
+        rows = list(IngredientRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'))
+        with self.lock:
+            if self.postings is None:
+                return
+            for recipe_id in recipe_ids:
+                for ingredient_id in self.ingredients.pop(recipe_id, ()):
+                    posting = self.postings[ingredient_id]
+                    position = bisect_left(posting, recipe_id)
+                    if (
+                        position < len(posting)
+                        and posting[position] == recipe_id
+                    ):
+                        del posting[position]
+            for recipe_id, ingredient_id in rows:
+                insort(
+                    self.postings.setdefault(ingredient_id, array('i')),
+                    recipe_id,
+                )
+                self.ingredients.setdefault(
+                    recipe_id, array('i')
+                ).append(ingredient_id)
+
+    def refresh_on_commit(self, recipe_ids):
+        if self.postings is None and self.pending is None:
+            return
+        recipe_ids = list(recipe_ids)
+        transaction.on_commit(lambda: self.refresh(recipe_ids))
+
+    def match(self, ingredient_ids, min_coverage=0, limit=MAX_MATCHES):
+        """Rank recipes by the share of their ingredients that are given.
+
+        Returns (recipe id, matched, total) tuples, the best covered
+        first, then those missing the fewest ingredients, then the newest.
+        """
+        matches = None
+        while matches is None:
+            self.ensure_index()
+            with self.lock:
+                # An invalidate() may have dropped the index meanwhile.
+                if self.postings is None:
+                    continue
+                hits = Counter()
+                for ingredient_id in set(ingredient_ids):
+                    hits.update(self.postings.get(ingredient_id, ()))
+                matches = [
+                    (recipe_id, matched, len(self.ingredients[recipe_id]))
+                    for recipe_id, matched in hits.items()
+                ]
+        return heapq.nlargest(
+            limit,
+            (
+                match for match in matches
+                if match[1] >= min_coverage * match[2]
+            ),
+            key=lambda match: (match[1] / match[2], match[1] - match[2],
+                               match[0]),
+        )
+
+
+cookable_index = CookableIndex()
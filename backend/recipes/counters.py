@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models import (
+    Case, Count, F, OuterRef, Subquery, Value, When
+)
+from django.db.models.functions import Coalesce
+
+from users.models import Subscribe, User
+from .models import Favorite, Recipe, ShoppingCart, ShoppingCartIngredient
+
+
+def increment(model, pk, field):
+    model.objects.filter(pk=pk).update(**{field: F(field) + 1})
+
+
+def decrement(model, pk, field):
+    model.objects.filter(pk=pk, **{f'{field}__gt': 0}).update(
+        **{field: F(field) - 1}
+    )
+
+
+def add_to(model, field, amounts):
+    """Add ``amounts`` (pk -> delta) to ``field`` with a single UPDATE."""
+    if not amounts:
+        return
+    model.objects.filter(pk__in=amounts).update(**{field: F(field) + Case(
+        *(When(pk=pk, then=Value(delta)) for pk, delta in amounts.items()),
+        default=Value(0),
+    )})
+
+
+def count_of(model, field):
+    """Correlated COUNT(*) of ``model`` rows pointing at the outer row."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), Value(0))
+
+
+@transaction.atomic
+def recalculate_counters():
+    """Recompute every denormalized counter and the shopping cart totals.
+
+    The counters take one UPDATE per table, the cart totals are deleted
+    and inserted again from the carts.
+    """
+    Recipe.objects.update(
+        favorites_count=count_of(Favorite, 'recipe'),
+        in_carts_count=count_of(ShoppingCart, 'recipe'),
+    )
+    User.objects.update(
+        followers_count=count_of(Subscribe, 'author'),
+        recipes_count=count_of(Recipe, 'author'),
+    )
+    ShoppingCartIngredient.objects.rebuild()
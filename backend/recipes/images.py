@@ -0,0 +1,85 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image
+
+from .models import Recipe
+from .signals import recipe_changed
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (320, 320)
+WEBP_DIR = 'static/recipe/webp/'
+THUMBNAIL_DIR = 'static/recipe/thumbnails/'
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='recipe-images',
+        )
+    return _executor
+
+
+def save_webp(image, name):
+    output = BytesIO()
+    image.save(output, 'WEBP', quality=settings.IMAGE_WEBP_QUALITY)
+    return default_storage.save(name, ContentFile(output.getvalue()))
+
+
+def make_variants(recipe_id, image_name):
+    """Store a WebP copy and a WebP thumbnail of the recipe image."""
+    with default_storage.open(image_name) as file:
+        image = Image.open(file)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    stem = PurePosixPath(image_name).stem
+    image_webp = save_webp(image, f'{WEBP_DIR}{stem}.webp')
+    image.thumbnail(THUMBNAIL_SIZE)
+    thumbnail = save_webp(image, f'{THUMBNAIL_DIR}{stem}.webp')
+    old = Recipe.objects.filter(pk=recipe_id).values_list(
+        'thumbnail', 'image_webp'
+    ).first()
+    # The image may have been replaced while this one was processed.
+    updated = Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        thumbnail=thumbnail, image_webp=image_webp
+    )
+    if updated:
+        recipe_changed.send(sender=Recipe, recipe_id=recipe_id)
+    stale = old if updated else (thumbnail, image_webp)
+    for name in stale or ():
+        if name:
+            default_storage.delete(name)
+
+
+def process_image(recipe_id, image_name):
+    try:
+        make_variants(recipe_id, image_name)
+    except Exception:
+        logger.exception('Image processing failed for recipe %s', recipe_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(recipe):
+    """Generate the image variants in the worker pool after commit."""
+    recipe_id, image_name = recipe.pk, recipe.image.name
+
+    def submit():
+        if settings.IMAGE_PROCESSING_WORKERS:
+            get_executor().submit(process_image, recipe_id, image_name)
+        else:
+            make_variants(recipe_id, image_name)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,64 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .models import Ingredient
+
+
+class IngredientIndex:
+    """Case-folded, name-sorted in-memory index for prefix lookups.
+
+    The index is built lazily on first use, dropped by the Ingredient
+    signals of this process and rebuilt after INGREDIENT_INDEX_TTL seconds
+    so changes made by other workers or bulk imports are picked up too.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys = None
+        self.items = None
+        self.built_at = 0
+
+    def invalidate(self):
+        with self.lock:
+            self.keys = None
+
+    def build(self):
+        rows = sorted(
+            (name.casefold(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        items = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for _, pk, name, measurement_unit in rows
+        ]
+        self.items = items
+        self.keys = [row[0] for row in rows]
+        self.built_at = time.monotonic()
+
+    def get_index(self):
+        with self.lock:
+            expired = (
+                time.monotonic() - self.built_at
+                > settings.INGREDIENT_INDEX_TTL
+            )
+            if self.keys is None or expired:
+                self.build()
+            return self.keys, self.items
+
+    def search(self, prefix='', limit=None):
+        keys, items = self.get_index()
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = start
+        stop = len(keys) if limit is None else min(start + limit, len(keys))
+        while end < stop and keys[end].startswith(prefix):
+            end += 1
+        return items[start:end]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes import similarities
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the similar recipes used by /api/recipes/recommended/ '
+        'from favorites, shopping carts and shared ingredients'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--neighbours',
+            type=int,
+            default=50,
+            help='Similar recipes kept per recipe',
+        )
+        parser.add_argument(
+            '--ingredient-weight',
+            type=float,
+            default=0.3,
+            help='Share of shared ingredients in the similarity, 0 to 1',
+        )
+        parser.add_argument(
+            '--max-ingredient-share',
+            type=float,
+            default=0.2,
+            help='Ignore ingredients used by a larger share of recipes',
+        )
+        parser.add_argument('--block-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if similarities.np is None:
+            raise CommandError('build_recommendations needs numpy and scipy')
+        started = time.perf_counter()
+        stored = similarities.build_similarities(
+            neighbours=options['neighbours'],
+            ingredient_weight=options['ingredient_weight'],
+            max_ingredient_share=options['max_ingredient_share'],
+            block_size=options['block_size'],
+        )
+        return (
+            f'Similar recipes stored for {stored} recipes in '
+            f'{time.perf_counter() - started:.1f}s'
+        )
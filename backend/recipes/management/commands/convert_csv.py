@@ -1,26 +1,112 @@
 import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.db import IntegrityError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from recipes.models import Ingredient
 
+READ_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        yield row['name'], row['measurement_unit']
+
+
+def read_json(file):
+    """Yield objects of a top-level JSON array without loading it whole."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and buffer[position:position + 1] == '[':
+                started = True
+                position += 1
+                continue
+            if buffer[position:position + 1] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield item['name'], item['measurement_unit']
+        buffer = buffer[position:]
+        if not chunk:
+            if buffer.strip():
+                raise CommandError('Malformed JSON ingredient file')
+            return
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
 
 class Command(BaseCommand):
-    help = 'CSV file download...'
+    help = 'Import ingredients from a CSV or JSON file, skipping existing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=f'{settings.BASE_DIR}/data/ingredients.csv',
+        )
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='File format, detected from the extension by default',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def import_batch(self, batch):
+        rows = dict.fromkeys(
+            (name.strip(), unit.strip()) for name, unit in batch
+        )
+        with transaction.atomic():
+            existing = set(Ingredient.objects.filter(
+                name__in={name for name, _ in rows}
+            ).values_list('name', 'measurement_unit'))
+            new = [
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in rows if (name, unit) not in existing
+            ]
+            # The unique constraint skips rows that a concurrent import
+            # inserted after the lookup.
+            Ingredient.objects.bulk_create(new, ignore_conflicts=True)
+        return len(new)
 
     def handle(self, *args, **options):
-        with open(
-            f'{settings.BASE_DIR}/data/ingredients.csv',
-            'r',
-            encoding='utf-8'
-        ) as csv_file:
-            reader = csv.DictReader(csv_file)
-            try:
-                Ingredient.objects.bulk_create(
-                    Ingredient(**items) for items in reader
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f'Unsupported file format: {file_format}')
+        started = time.perf_counter()
+        processed = created = 0
+        with open(path, 'r', encoding='utf-8') as file:
+            rows = READERS[file_format](file)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                processed += len(batch)
+                created += self.import_batch(batch)
+                self.stdout.write(
+                    f'{processed} processed, {created} created'
                 )
-            except IntegrityError:
-                return 'This ingredient is already exists'
+        elapsed = time.perf_counter() - started
         return (
-            f'{Ingredient.objects.count()} - ingredients download')
+            f'{created} ingredients created, '
+            f'{processed - created} skipped in {elapsed:.2f}s '
+            f'({processed / max(elapsed, 1e-9):.0f} rows/s)'
+        )
@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from recipes.bulk import export_recipes
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Export recipes as NDJSON in the format import_recipes reads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-', help='Output file, "-" for stdout'
+        )
+        parser.add_argument(
+            '--author', help='Export the recipes of this user only'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if options['author']:
+            recipes = recipes.filter(author__username=options['author'])
+        if options['path'] == '-':
+            file = sys.stdout
+        else:
+            file = open(options['path'], 'w', encoding='utf-8')
+        try:
+            file.writelines(export_recipes(recipes))
+        finally:
+            if file is not sys.stdout:
+                file.close()
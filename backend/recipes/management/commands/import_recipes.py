@@ -0,0 +1,57 @@
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.bulk import RecipeImporter
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Import recipes from an NDJSON file, skipping existing names'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON file, "-" for stdin')
+        parser.add_argument(
+            '--author',
+            help='Username to own every recipe instead of the "author" key',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--no-image-variants',
+            action='store_true',
+            help='Do not generate WebP variants of the imported images',
+        )
+
+    def handle(self, *args, **options):
+        author = None
+        if options['author']:
+            author = User.objects.filter(username=options['author']).first()
+            if author is None:
+                raise CommandError(f'Unknown author: {options["author"]}')
+        importer = RecipeImporter(
+            author=author,
+            batch_size=options['batch_size'],
+            image_variants=not options['no_image_variants'],
+            image_paths=True,
+        )
+        started = time.perf_counter()
+        if options['path'] == '-':
+            file = sys.stdin
+        else:
+            file = open(Path(options['path']), 'r', encoding='utf-8')
+        with file:
+            for _ in importer.run(file):
+                self.stdout.write(
+                    f'{importer.created} created, '
+                    f'{importer.skipped} skipped'
+                )
+        for error in importer.errors:
+            self.stderr.write(f'line {error["line"]}: {error["error"]}')
+        elapsed = time.perf_counter() - started
+        processed = importer.created + importer.skipped
+        return (
+            f'{importer.created} recipes created, '
+            f'{importer.skipped} skipped in {elapsed:.2f}s '
+            f'({processed / max(elapsed, 1e-9):.0f} rows/s)'
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from recipes.counters import recalculate_counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute favorite, cart, follower and recipe counters and the '
+        'shopping cart ingredient totals'
+    )
+
+    def handle(self, *args, **options):
+        recalculate_counters()
+        return 'Counters recalculated'
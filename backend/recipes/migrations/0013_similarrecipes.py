@@ -0,0 +1,24 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarRecipes',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similar', serialize=False, to='recipes.recipe', verbose_name='Recipe')),
+                ('recipe_ids', models.BinaryField(verbose_name='Similar recipes')),
+                ('scores', models.BinaryField(verbose_name='Similarity scores')),
+            ],
+            options={
+                'verbose_name': 'Similar recipes',
+                'verbose_name_plural': 'Similar recipes',
+            },
+        ),
+    ]
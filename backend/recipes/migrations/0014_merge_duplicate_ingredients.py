@@ -0,0 +1,67 @@
+from django.db import migrations
+
+MAX_AMOUNT = 32767
+
+
+def merge_rows(model, owner, amount, kept_ids, cap=None):
+    """Point rows of ``model`` at the kept ingredients.
+
+    Rows that end up on the same owner and ingredient are merged into the
+    oldest one by summing ``amount``, so the unique owner/ingredient
+    constraints of the table still hold.
+    """
+    survivors, extra = {}, []
+    rows = model.objects.filter(
+        ingredient_id__in=[*kept_ids, *set(kept_ids.values())]
+    ).order_by('id')
+    for row in rows.iterator():
+        key = getattr(row, f'{owner}_id'), kept_ids.get(
+            row.ingredient_id, row.ingredient_id
+        )
+        if key not in survivors:
+            row.ingredient_id = key[1]
+            survivors[key] = row
+            continue
+        survivor = survivors[key]
+        total = getattr(survivor, amount) + getattr(row, amount)
+        setattr(survivor, amount, total if cap is None else min(total, cap))
+        extra.append(row.id)
+    model.objects.filter(id__in=extra).delete()
+    model.objects.bulk_update(
+        survivors.values(), ('ingredient', amount), batch_size=1000
+    )
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    ShoppingCartIngredient = apps.get_model(
+        'recipes', 'ShoppingCartIngredient'
+    )
+    # Imports run before the constraint existed may have stored the same
+    # ingredient more than once; keep the lowest id of every group.
+    kept_ids, first = {}, {}
+    for ingredient_id, name, unit in Ingredient.objects.order_by(
+        'id'
+    ).values_list('id', 'name', 'measurement_unit').iterator():
+        kept = first.setdefault((name, unit), ingredient_id)
+        if kept != ingredient_id:
+            kept_ids[ingredient_id] = kept
+    if not kept_ids:
+        return
+    merge_rows(IngredientRecipe, 'recipe', 'amount', kept_ids, MAX_AMOUNT)
+    merge_rows(ShoppingCartIngredient, 'user', 'total', kept_ids)
+    Ingredient.objects.filter(id__in=kept_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_similarrecipes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+    ]
@@ -1,12 +1,24 @@
+import re
+from array import array
+
 from colorfield.fields import ColorField
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, SearchVectorField
+)
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.db import connections, models, transaction
+from django.db.models import (
+    Case, Exists, F, OuterRef, Prefetch, Q, UniqueConstraint, When
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
 
-from users.models import User
+from users.models import Subscribe, User
 
 MAX_LEN_SHORT = 15
 MAX_LEN_MED = 100
+RECIPE_FTS_TABLE = 'recipes_recipe_fts'
 
 
 class Ingredient(models.Model):
@@ -23,6 +35,12 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ingredient'
         verbose_name_plural = 'Ingredients'
+        constraints = (
+            UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient',
+            ),
+        )
 
     def __str__(self) -> str:
         return f'{self.name} {self.measurement_unit}'
@@ -49,6 +67,80 @@ class Tag(models.Model):
         return f'{self.slug}'
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_related(self):
+        """Fetch everything the recipe serializers read in three queries."""
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_list',
+                queryset=IngredientRecipe.objects.select_related('ingredient'),
+            ),
+        )
+
+    def with_user_flags(self, user):
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            author_is_subscribed=Exists(Subscribe.objects.filter(
+                user=user, author=OuterRef('author')
+            )),
+        )
+
+    def update_search_vector(self):
+        if connections[self.db].vendor != 'postgresql':
+            return
+        config = settings.SEARCH_CONFIG
+        self.update(search_vector=(
+            SearchVector('name', weight='A', config=config)
+            + SearchVector('text', weight='B', config=config)
+        ))
+
+    def search(self, query):
+        """Filter by recipes containing every word as a prefix, best first.
+
+        PostgreSQL matches the GIN-indexed search_vector column, SQLite
+        the FTS5 table maintained by triggers. Other backends fall back
+        to a substring match.
+        """
+        words = re.findall(r'\w+', query)
+        if not words:
+            return self
+        connection = connections[self.db]
+        if connection.vendor == 'postgresql':
+            search_query = SearchQuery(
+                ' & '.join(f'{word}:*' for word in words),
+                config=settings.SEARCH_CONFIG,
+                search_type='raw',
+            )
+            # ts_rank() returns a real; as a double it survives the round
+            # trip through a pagination cursor and compares exactly.
+            return self.filter(search_vector=search_query).annotate(
+                search_rank=Cast(
+                    SearchRank(F('search_vector'), search_query),
+                    models.FloatField(),
+                )
+            ).order_by('-search_rank', '-id')
+        if connection.vendor == 'sqlite':
+            match = ' '.join(f'"{word}"*' for word in words)
+            return self.filter(id__in=RawSQL(
+                f'SELECT rowid FROM {RECIPE_FTS_TABLE} '
+                f'WHERE {RECIPE_FTS_TABLE} MATCH %s',
+                (match,),
+            )).annotate(search_rank=RawSQL(
+                f'SELECT rank FROM {RECIPE_FTS_TABLE} '
+                f'WHERE {RECIPE_FTS_TABLE} MATCH %s '
+                f'AND rowid = {Recipe._meta.db_table}.id',
+                (match,),
+            )).order_by('search_rank', '-id')
+        return self.filter(Q(name__icontains=query) | Q(text__icontains=query))
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -64,6 +156,16 @@ class Recipe(models.Model):
         verbose_name='Recipe image',
         upload_to='static/recipe/',
     )
+    thumbnail = models.ImageField(
+        verbose_name='Recipe thumbnail',
+        blank=True,
+        editable=False,
+    )
+    image_webp = models.ImageField(
+        verbose_name='Recipe image in WebP',
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(
         verbose_name='Recipe description',
     )
@@ -78,14 +180,50 @@ class Recipe(models.Model):
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Cooking time',
     )
+    pub_date = models.DateTimeField(
+        verbose_name='Publication date',
+        auto_now_add=True,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Favorites',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='In shopping carts',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Recipe'
         verbose_name_plural = 'Recipes'
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=('-favorites_count', '-id'),
+                name='recipe_favorites_count_idx',
+            ),
+        )
 
     def __str__(self):
         return f'{self.name}'
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Recipe.objects.using(self._state.db).filter(
+            pk=self.pk
+        ).update_search_vector()
+
 
 class IngredientRecipe(models.Model):
     recipe = models.ForeignKey(
@@ -125,7 +263,76 @@ class IngredientRecipe(models.Model):
         return f'{self.ingredient} {self.amount}'
 
 
+class FavoriteAndShopManager(models.Manager):
+    """Add and remove a user's recipes, keeping their counters in step.
+
+    Single and batch API requests, the admin and the deletion of users
+    and recipes all go through ``count``. The models have no per-row
+    signals, so a batch is added with one INSERT and removed with one
+    DELETE.
+    """
+
+    def lock_user(self, user_id):
+        # Concurrent requests of the same user must not count a row twice.
+        list(User.objects.select_for_update().filter(
+            pk=user_id
+        ).values_list('pk', flat=True))
+
+    def add(self, user_id, recipe_ids):
+        """Add the recipes the user does not have yet, return their ids."""
+        with transaction.atomic():
+            self.lock_user(user_id)
+            present = set(self.filter(
+                user_id=user_id, recipe_id__in=recipe_ids
+            ).values_list('recipe_id', flat=True))
+            added = [
+                recipe_id for recipe_id in dict.fromkeys(recipe_ids)
+                if recipe_id not in present
+            ]
+            self.bulk_create(
+                (
+                    self.model(user_id=user_id, recipe_id=recipe_id)
+                    for recipe_id in added
+                ),
+                ignore_conflicts=True,
+            )
+            self.count(user_id, added)
+        return added
+
+    def remove(self, user_id, recipe_ids):
+        """Remove the recipes the user has, return their ids."""
+        with transaction.atomic():
+            self.lock_user(user_id)
+            rows = self.filter(user_id=user_id, recipe_id__in=recipe_ids)
+            removed = list(rows.values_list('recipe_id', flat=True))
+            rows.delete()
+            self.count(user_id, removed, sign=-1)
+        return removed
+
+    def count(self, user_id, recipe_ids, sign=1):
+        """Count the recipes added to (or removed from) the user's rows."""
+        self.update_counters(recipe_ids, sign)
+
+    def update_counters(self, recipe_ids, sign):
+        if not recipe_ids:
+            return
+        field = self.model.counter_field
+        recipes = Recipe.objects.filter(pk__in=recipe_ids)
+        if sign < 0:
+            recipes = recipes.filter(**{f'{field}__gt': 0})
+        recipes.update(**{field: F(field) + sign})
+
+
+class ShoppingCartManager(FavoriteAndShopManager):
+
+    def count(self, user_id, recipe_ids, sign=1):
+        super().count(user_id, recipe_ids, sign)
+        ShoppingCartIngredient.objects.add_recipes(user_id, recipe_ids, sign)
+
+
 class FavoriteAndShopModel(models.Model):
+    """A user's recipe; add and remove rows through ``objects``."""
+
     user = models.ForeignKey(
         User,
         verbose_name='User',
@@ -145,6 +352,10 @@ class FavoriteAndShopModel(models.Model):
 
 
 class Favorite(FavoriteAndShopModel):
+    counter_field = 'favorites_count'
+
+    objects = FavoriteAndShopManager()
+
     class Meta(FavoriteAndShopModel.Meta):
         verbose_name = 'Favorite Recipe'
         verbose_name_plural = 'Favorite Recipes'
@@ -155,9 +366,19 @@ class Favorite(FavoriteAndShopModel):
                 name='unique_favorite'
             )
         ]
+        indexes = (
+            models.Index(
+                fields=('recipe', 'user'),
+                name='favorite_recipe_user_idx',
+            ),
+        )
 
 
 class ShoppingCart(FavoriteAndShopModel):
+    counter_field = 'in_carts_count'
+
+    objects = ShoppingCartManager()
+
     class Meta(FavoriteAndShopModel.Meta):
         verbose_name = 'Shopping cart'
         verbose_name_plural = 'Shopping carts'
@@ -168,3 +389,152 @@ class ShoppingCart(FavoriteAndShopModel):
                 name='unique_shopping_cart',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('user', 'recipe'),
+                name='shopping_cart_user_recipe_idx',
+            ),
+        )
+
+
+class ShoppingCartIngredientManager(models.Manager):
+
+    def apply_deltas(self, user_ids, deltas):
+        """Add per-ingredient amount deltas to the totals of every user."""
+        user_ids = list(user_ids)
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        if not user_ids or not deltas:
+            return
+        with transaction.atomic():
+            # Lock the users so concurrent cart changes are serialized.
+            list(User.objects.select_for_update().filter(
+                pk__in=user_ids
+            ).order_by('pk').values_list('pk', flat=True))
+            rows = self.filter(user_id__in=user_ids, ingredient_id__in=deltas)
+            existing = set(rows.values_list('user_id', 'ingredient_id'))
+            rows.update(total=Case(
+                *(
+                    When(ingredient_id=ingredient_id, then=F('total') + delta)
+                    for ingredient_id, delta in deltas.items()
+                ),
+                default=F('total'),
+            ))
+            self.bulk_create(
+                self.model(
+                    user_id=user_id, ingredient_id=ingredient_id, total=delta
+                )
+                for user_id in user_ids
+                for ingredient_id, delta in deltas.items()
+                if (user_id, ingredient_id) not in existing and delta > 0
+            )
+            rows.filter(total__lte=0).delete()
+
+    def get_deltas(self, recipe_ids, sign=1):
+        """Ingredient amounts of the recipes, summed and signed."""
+        return {
+            ingredient_id: sign * total
+            for ingredient_id, total in IngredientRecipe.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values('ingredient_id').annotate(
+                total=models.Sum('amount')
+            ).values_list('ingredient_id', 'total').order_by()
+        }
+
+    def add_recipes(self, user_id, recipe_ids, sign=1):
+        if recipe_ids:
+            self.apply_deltas([user_id], self.get_deltas(recipe_ids, sign))
+
+    def rebuild(self, user_ids=None):
+        """Recompute the totals of the given users, or of everyone."""
+        rows, totals = self.all(), IngredientRecipe.objects.filter(
+            recipe__shopping_cart__isnull=False
+        )
+        if user_ids is not None:
+            rows = rows.filter(user_id__in=user_ids)
+            totals = totals.filter(
+                recipe__shopping_cart__user_id__in=user_ids
+            )
+        with transaction.atomic():
+            rows.delete()
+            self.bulk_create(
+                (
+                    self.model(
+                        user_id=row['recipe__shopping_cart__user'],
+                        ingredient_id=row['ingredient'],
+                        total=row['total'],
+                    )
+                    for row in totals.values(
+                        'recipe__shopping_cart__user', 'ingredient'
+                    ).annotate(total=models.Sum('amount')).order_by()
+                ),
+                batch_size=1000,
+            )
+
+
+class ShoppingCartIngredient(models.Model):
+    """Ingredient totals of a user's shopping cart, kept up to date."""
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='User',
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ingredient',
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+    )
+    total = models.IntegerField(
+        verbose_name='Total amount',
+    )
+
+    objects = ShoppingCartIngredientManager()
+
+    class Meta:
+        verbose_name = 'Shopping cart ingredient'
+        verbose_name_plural = 'Shopping cart ingredients'
+        constraints = (
+            UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_cart_ingredient',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} - {self.ingredient} {self.total}'
+
+
+class SimilarRecipes(models.Model):
+    """Most similar recipes of a recipe, built by build_recommendations.
+
+    The neighbours are stored as packed int32 ids and float32 scores in
+    descending score order, a few hundred bytes per recipe.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name='Recipe',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='similar',
+    )
+    recipe_ids = models.BinaryField(verbose_name='Similar recipes')
+    scores = models.BinaryField(verbose_name='Similarity scores')
+
+    class Meta:
+        verbose_name = 'Similar recipes'
+        verbose_name_plural = 'Similar recipes'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {len(self.recipe_ids) // 4} neighbours'
+
+    def neighbours(self):
+        recipe_ids, scores = array('i'), array('f')
+        recipe_ids.frombytes(self.recipe_ids)
+        scores.frombytes(self.scores)
+        return zip(recipe_ids, scores)
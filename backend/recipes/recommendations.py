@@ -0,0 +1,44 @@
+import heapq
+from collections import Counter
+
+from django.db.models import Q
+
+from .models import Favorite, Recipe, ShoppingCart, SimilarRecipes
+
+MAX_RECOMMENDATIONS = 100
+
+
+def saved_by(user):
+    """Match the recipes the user favorited or put in the cart."""
+    return Q(
+        pk__in=Favorite.objects.filter(user=user).values('recipe_id')
+    ) | Q(
+        pk__in=ShoppingCart.objects.filter(user=user).values('recipe_id')
+    )
+
+
+def get_recommended_ids(user, limit=MAX_RECOMMENDATIONS):
+    """Rank recipes by their summed similarity to the user's saved ones.
+
+    The neighbours of every favorited or carted recipe are read in one
+    query and merged in memory. Recipes the user already saved or wrote
+    are left out.
+    """
+    saved = saved_by(user)
+    scores = Counter()
+    seeds = set()
+    # The primary key of SimilarRecipes is the recipe id, so the same
+    # condition selects the neighbours of the saved recipes.
+    for similar in SimilarRecipes.objects.filter(saved):
+        seeds.add(similar.recipe_id)
+        for recipe_id, score in similar.neighbours():
+            scores[recipe_id] += score
+    for recipe_id in seeds:
+        scores.pop(recipe_id, None)
+    candidates = heapq.nlargest(limit, scores, key=scores.get)
+    allowed = set(
+        Recipe.objects.filter(pk__in=candidates).exclude(author=user)
+        .exclude(saved).values_list('pk', flat=True)
+    )
+    return [recipe_id for recipe_id in candidates if recipe_id in allowed]
+
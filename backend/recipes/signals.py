@@ -0,0 +1,116 @@
+from django.db import connections, transaction
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_delete
+)
+from django.dispatch import Signal, receiver
+
+from users.models import User
+from .cookable_index import cookable_index
+from .counters import decrement, increment
+from .ingredient_index import ingredient_index
+from .models import (
+    RECIPE_FTS_TABLE, Favorite, Ingredient, IngredientRecipe, Recipe,
+    ShoppingCart, ShoppingCartIngredient, Tag
+)
+from .tag_index import tag_index
+
+# Sent with ``recipe_id`` when a recipe row changes through a queryset
+# update, which sends no model signals.
+recipe_changed = Signal()
+
+RECIPE_FTS_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {RECIPE_FTS_TABLE} USING fts5("
+    f"name, text, content='{{table}}', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {RECIPE_FTS_TABLE}_insert "
+    f"AFTER INSERT ON {{table}} BEGIN "
+    f"INSERT INTO {RECIPE_FTS_TABLE}(rowid, name, text) "
+    f"VALUES (new.id, new.name, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {RECIPE_FTS_TABLE}_delete "
+    f"AFTER DELETE ON {{table}} BEGIN "
+    f"INSERT INTO {RECIPE_FTS_TABLE}({RECIPE_FTS_TABLE}, rowid, name, text) "
+    f"VALUES ('delete', old.id, old.name, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {RECIPE_FTS_TABLE}_update "
+    f"AFTER UPDATE OF name, text ON {{table}} BEGIN "
+    f"INSERT INTO {RECIPE_FTS_TABLE}({RECIPE_FTS_TABLE}, rowid, name, text) "
+    f"VALUES ('delete', old.id, old.name, old.text); "
+    f"INSERT INTO {RECIPE_FTS_TABLE}(rowid, name, text) "
+    f"VALUES (new.id, new.name, new.text); END",
+    f"INSERT INTO {RECIPE_FTS_TABLE}({RECIPE_FTS_TABLE}) VALUES ('rebuild')",
+)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_from_cart_totals(sender, instance, **kwargs):
+    # The carts holding the recipe are deleted by the cascade. pre_delete
+    # runs before the recipe's ingredient rows are gone, so their amounts
+    # can still be subtracted.
+    user_ids = list(ShoppingCart.objects.filter(recipe=instance).values_list(
+        'user_id', flat=True
+    ))
+    if user_ids:
+        ShoppingCartIngredient.objects.apply_deltas(
+            user_ids,
+            ShoppingCartIngredient.objects.get_deltas([instance.pk], -1),
+        )
+
+
+@receiver(pre_delete, sender=User)
+def uncount_user_recipes(sender, instance, **kwargs):
+    # The user's favorites and carts are deleted by the cascade; their
+    # own cart totals go with them.
+    for model in (Favorite, ShoppingCart):
+        model.objects.update_counters(
+            list(model.objects.filter(user=instance).values_list(
+                'recipe_id', flat=True
+            )),
+            sign=-1,
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        increment(User, instance.author_id, 'recipes_count')
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    decrement(User, instance.author_id, 'recipes_count')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    # Again on commit: a rebuild by another request in between would
+    # keep the old rows until the TTL.
+    for index in (ingredient_index, cookable_index):
+        index.invalidate()
+        transaction.on_commit(index.invalidate)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientRecipe)
+def refresh_cookable_index(sender, instance, **kwargs):
+    recipe_id = instance.pk if sender is Recipe else instance.recipe_id
+    cookable_index.refresh_on_commit([recipe_id])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_index(sender, **kwargs):
+    tag_index.invalidate()
+    transaction.on_commit(tag_index.invalidate)
+
+
+@receiver(post_migrate)
+def create_recipe_fts(sender, using, **kwargs):
+    # SQLite drops triggers whenever a migration rebuilds the recipe
+    # table, so the FTS5 index is recreated after every migrate run.
+    connection = connections[using]
+    if sender.name != 'recipes' or connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for sql in RECIPE_FTS_SQL:
+            cursor.execute(sql.format(table=Recipe._meta.db_table))
@@ -0,0 +1,106 @@
+import math
+from collections import Counter
+
+from django.db import transaction
+
+from .models import (
+    Favorite, IngredientRecipe, Recipe, ShoppingCart, SimilarRecipes
+)
+
+# Only build_recommendations imports this module, so web workers never
+# load NumPy and SciPy.
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+
+def normalized(matrix):
+    """Scale the rows of a sparse matrix to unit length."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms.ravel()) @ matrix
+
+
+def incidence(recipe_ids, pairs):
+    """Sparse recipe x column matrix from (recipe id, column id) pairs."""
+    pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+    columns, column_index = np.unique(pairs[:, 1], return_inverse=True)
+    return sparse.csr_matrix(
+        (
+            np.ones(len(pairs)),
+            (np.searchsorted(recipe_ids, pairs[:, 0]), column_index),
+        ),
+        shape=(len(recipe_ids), len(columns)),
+    ), columns
+
+
+def build_similarities(neighbours=50, ingredient_weight=0.3,
+                       max_ingredient_share=0.2, block_size=500):
+    """Rebuild the SimilarRecipes table from saves and shared ingredients.
+
+    Two recipes are similar when the same users favorite or cart them
+    (cosine over users) and when they share ingredients (cosine over
+    IDF-weighted ingredients, ignoring ingredients in more than
+    ``max_ingredient_share`` of the recipes). The similarity matrix is
+    computed a block of rows at a time and only the top ``neighbours`` of
+    every row are kept. Returns the number of recipes stored.
+    """
+    recipe_ids = np.array(
+        Recipe.objects.order_by('pk').values_list('pk', flat=True),
+        dtype=np.int64,
+    )
+    total = len(recipe_ids)
+    if not total:
+        return 0
+    by_users, _ = incidence(recipe_ids, [
+        *Favorite.objects.values_list('recipe_id', 'user_id'),
+        *ShoppingCart.objects.values_list('recipe_id', 'user_id'),
+    ])
+    ingredients = list(
+        IngredientRecipe.objects.values_list('recipe_id', 'ingredient_id')
+    )
+    frequency = Counter(ingredient_id for _, ingredient_id in ingredients)
+    by_ingredients, ingredient_ids = incidence(recipe_ids, [
+        pair for pair in ingredients
+        if frequency[pair[1]] <= max_ingredient_share * total
+    ])
+    by_ingredients = by_ingredients @ sparse.diags([
+        math.log(total / frequency[pk]) for pk in ingredient_ids.tolist()
+    ])
+    by_users = normalized(by_users).tocsr()
+    by_ingredients = normalized(by_ingredients).tocsr()
+    users_t = by_users.T.tocsc()
+    ingredients_t = by_ingredients.T.tocsc()
+    rows = []
+    for start in range(0, total, block_size):
+        block = slice(start, start + block_size)
+        similarity = (
+            (1 - ingredient_weight) * (by_users[block] @ users_t)
+            + ingredient_weight * (by_ingredients[block] @ ingredients_t)
+        ).tocsr()
+        for offset in range(similarity.shape[0]):
+            row = start + offset
+            begin, end = similarity.indptr[offset:offset + 2]
+            columns = similarity.indices[begin:end]
+            scores = similarity.data[begin:end]
+            keep = (columns != row) & (scores > 0)
+            columns, scores = columns[keep], scores[keep]
+            if len(scores) > neighbours:
+                top = np.argpartition(-scores, neighbours)[:neighbours]
+                columns, scores = columns[top], scores[top]
+            if not len(scores):
+                continue
+            order = np.argsort(-scores, kind='stable')
+            rows.append(SimilarRecipes(
+                recipe_id=int(recipe_ids[row]),
+                recipe_ids=recipe_ids[columns[order]].astype(
+                    np.int32
+                ).tobytes(),
+                scores=scores[order].astype(np.float32).tobytes(),
+            ))
+    with transaction.atomic():
+        SimilarRecipes.objects.all().delete()
+        SimilarRecipes.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
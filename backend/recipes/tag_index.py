@@ -0,0 +1,45 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Tag
+
+MISS_REBUILD_INTERVAL = 1
+
+
+class TagIndex:
+    """In-memory slug to id map of the tags.
+
+    Like the ingredient index it is built lazily, dropped by the Tag
+    signals of this process and rebuilt after TAG_INDEX_TTL seconds. An
+    unknown slug rebuilds it too, at most once a second, so tags created
+    by other workers are found before the TTL runs out.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = None
+        self.built_at = 0
+
+    def invalidate(self):
+        with self.lock:
+            self.ids = None
+
+    def build(self):
+        self.ids = dict(Tag.objects.values_list('slug', 'id'))
+        self.built_at = time.monotonic()
+
+    def get(self, slug):
+        with self.lock:
+            age = time.monotonic() - self.built_at
+            if (
+                self.ids is None
+                or age > settings.TAG_INDEX_TTL
+                or (slug not in self.ids and age > MISS_REBUILD_INTERVAL)
+            ):
+                self.build()
+            return self.ids.get(slug)
+
+
+tag_index = TagIndex()
@@ -10,6 +10,8 @@ class UserAdmin(admin.ModelAdmin):
         'first_name',
         'last_name',
         'email',
+        'followers_count',
+        'recipes_count',
     )
     list_editable = ('email',)
     list_filter = ('username', 'email')
@@ -10,6 +10,16 @@ class User(AbstractUser):
         verbose_name='email',
         unique=True
     )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Followers',
+        default=0,
+        editable=False,
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Recipes',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('username',)
@@ -39,6 +49,10 @@ class Subscribe(models.Model):
             models.CheckConstraint(check=~models.Q(user=models.F('author')),
                                    name='no_self_subscribe')
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='subscribe_author_user_idx'),
+        ]
 
         verbose_name = 'Subscription'
         verbose_name_plural = 'Subscriptions'